@@ -3,6 +3,7 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
+import threading
 from datetime import datetime
 import json
 
@@ -110,5 +111,23 @@ def get_recommendations(user_id):
 from routes import api
 app.register_blueprint(api, url_prefix='/api')
 
+# Prefetch curated MFApi schemes in the background (opt-in with ENABLE_CACHE_WARMER=true).
+# Started by the first request rather than at import, so importing the app
+# (tests, scripts, check_import_time.py) has no threads, network or disk side effects
+CACHE_WARMER_ENABLED = os.environ.get('ENABLE_CACHE_WARMER', 'false').lower() == 'true'
+_cache_warmer_lock = threading.Lock()
+_cache_warmer_started = False
+
+@app.before_request
+def start_cache_warmer_once():
+    global _cache_warmer_started
+    if not CACHE_WARMER_ENABLED or _cache_warmer_started:
+        return
+    with _cache_warmer_lock:
+        if not _cache_warmer_started:
+            from cache_warmer import start_cache_warmer
+            start_cache_warmer()
+            _cache_warmer_started = True
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,221 @@
+"""
+SIP Backtest - What a SIP in real schemes would have returned
+Buys units on every monthly SIP date at that day's NAV (or the next available
+one) from the stored NAV histories, for all dates and schemes at once, and
+reports units, invested amount, value over time and XIRR
+"""
+
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from nav_series import DAYS_PER_YEAR, NavSeries, to_epoch_day, today_epoch_day
+from xirr import xirr_many
+
+logger = logging.getLogger(__name__)
+
+
+def sip_dates(start_day: int, end_day: int, sip_day_of_month: Optional[int] = None) -> np.ndarray:
+    """
+    Monthly SIP dates between two epoch days (inclusive)
+    
+    Args:
+        start_day: First possible SIP date (epoch day)
+        end_day: Last possible SIP date (epoch day)
+        sip_day_of_month: Day of month to invest on (default: the start date's day);
+            moved to the last day in shorter months
+    
+    Returns:
+        Array of epoch days
+    """
+    start = np.datetime64(start_day, 'D')
+    if sip_day_of_month is None:
+        sip_day_of_month = int((start - start.astype('datetime64[M]')).astype(int)) + 1
+    
+    months = np.arange(start.astype('datetime64[M]'), np.datetime64(end_day, 'D').astype('datetime64[M]') + 1)
+    month_ends = (months + 1).astype('datetime64[D]') - 1
+    dates = np.minimum(months.astype('datetime64[D]') + (sip_day_of_month - 1), month_ends).astype(np.int64)
+    return dates[(dates >= start_day) & (dates <= end_day)]
+
+
+def backtest_sip(series_by_code: Dict[str, NavSeries], weights: Sequence[float], monthly_amount: float,
+                 start_day: int, end_day: Optional[int] = None,
+                 sip_day_of_month: Optional[int] = None) -> Dict:
+    """
+    Backtest a monthly SIP split across schemes
+    
+    Each instalment buys units at the first NAV on or after the SIP date.
+    Instalments falling before a scheme's first NAV are skipped for that scheme.
+    Holdings are valued on the valuation day: end_day, or the earliest of the
+    schemes' latest NAV dates if that comes first.
+    
+    Args:
+        series_by_code: NAV series per scheme code (in portfolio order)
+        weights: Share of the SIP amount per scheme (normalized to sum to 1)
+        monthly_amount: Total SIP amount per month
+        start_day: First SIP date (epoch day)
+        end_day: Valuation date (epoch day, default: today)
+        sip_day_of_month: Day of month of the SIP (default: start date's day)
+    
+    Returns:
+        Dict with portfolio totals and XIRR, per-scheme units/value/XIRR and
+        the invested amount and value on every SIP date
+    """
+    scheme_codes = list(series_by_code)
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(weights) != len(scheme_codes) or weights.sum() <= 0 or (weights < 0).any():
+        raise ValueError("Weights must be non-negative, one per scheme, and not all zero")
+    weights = weights / weights.sum()
+    if any(series is None or len(series) == 0 for series in series_by_code.values()):
+        raise ValueError("Every scheme needs a NAV history")
+    
+    valuation_day = min(series.latest_day for series in series_by_code.values())
+    if end_day is not None:
+        valuation_day = min(valuation_day, end_day)
+    dates = sip_dates(start_day, valuation_day, sip_day_of_month)
+    if len(dates) == 0:
+        raise ValueError("No SIP date falls between the start date and the latest NAV date")
+    
+    # (dates, schemes) matrices of purchase days/NAVs; NaN marks a skipped instalment
+    purchase_days = np.full((len(dates), len(scheme_codes)), -1, dtype=np.int64)
+    purchase_navs = np.full((len(dates), len(scheme_codes)), np.nan)
+    value_navs = np.empty((len(dates), len(scheme_codes)))
+    final_navs = np.empty(len(scheme_codes))
+    for column, series in enumerate(series_by_code.values()):
+        idx = np.searchsorted(series.days, dates, side='left')
+        valid = (dates >= series.days[0]) & (idx < len(series))
+        idx = np.minimum(idx, len(series) - 1)
+        valid &= series.days[idx] <= valuation_day
+        purchase_days[valid, column] = series.days[idx[valid]]
+        purchase_navs[valid, column] = series.navs[idx[valid]]
+        value_navs[:, column] = np.nan_to_num(series.navs_on_or_before(dates))
+        final_navs[column] = series.navs_on_or_before(np.array([valuation_day]))[0]
+    
+    bought = ~np.isnan(purchase_navs)
+    amounts = np.where(bought, monthly_amount * weights, 0.0)
+    units = np.divide(amounts, purchase_navs, out=np.zeros_like(amounts), where=bought)
+    held_units = np.cumsum(units, axis=0)
+    
+    invested_series = np.cumsum(amounts.sum(axis=1))
+    value_series = (held_units * value_navs).sum(axis=1)
+    scheme_invested = amounts.sum(axis=0)
+    scheme_values = held_units[-1] * final_navs
+    
+    # One solve for every scheme's cash flows plus the whole portfolio's
+    total_invested = float(scheme_invested.sum())
+    current_value = float(scheme_values.sum())
+    flow_amounts = [np.append(-amounts[bought[:, column], column], scheme_values[column])
+                    for column in range(len(scheme_codes))]
+    flow_days = [np.append(purchase_days[bought[:, column], column], valuation_day)
+                 for column in range(len(scheme_codes))]
+    flow_amounts.append(np.append(-amounts[bought], current_value))
+    flow_days.append(np.append(purchase_days[bought], valuation_day))
+    xirrs = xirr_many(flow_amounts, flow_days) * 100
+    
+    schemes = [
+        {
+            'scheme_code': scheme_code,
+            'allocation': round(float(weights[column]) * 100, 2),
+            'installments': int(bought[:, column].sum()),
+            'total_invested': round(float(scheme_invested[column]), 2),
+            'units': round(float(held_units[-1, column]), 4),
+            'latest_nav': float(final_navs[column]),
+            'current_value': round(float(scheme_values[column]), 2),
+            'xirr': _rounded(xirrs[column])
+        }
+        for column, scheme_code in enumerate(scheme_codes)
+    ]
+    
+    return {
+        'start_date': _iso(int(dates[0])),
+        'valuation_date': _iso(valuation_day),
+        'monthly_investment': monthly_amount,
+        'installments': int(len(dates)),
+        'portfolio': {
+            'total_invested': round(total_invested, 2),
+            'current_value': round(current_value, 2),
+            'gains': round(current_value - total_invested, 2),
+            'absolute_return_percentage': round((current_value / total_invested - 1) * 100, 2) if total_invested else 0.0,
+            'xirr': _rounded(xirrs[-1])
+        },
+        'schemes': schemes,
+        'series': {
+            'dates': [_iso(int(day)) for day in dates],
+            'invested': np.round(invested_series, 2).tolist(),
+            'value': np.round(value_series, 2).tolist()
+        }
+    }
+
+
+def trailing_sip_xirr_many(series_list: Sequence[Optional[NavSeries]], years: int = 3,
+                           today: Optional[int] = None) -> np.ndarray:
+    """
+    XIRR (%) of a monthly SIP over the last `years` years in each scheme
+    
+    Every scheme's SIP runs on the same dates and is valued at its latest NAV;
+    all series are solved in one xirr_many call. Schemes whose history doesn't
+    cover the whole period get NaN.
+    
+    Args:
+        series_list: NAV series per scheme (None allowed)
+        years: SIP duration in years
+        today: Epoch day the SIP ends (default: today)
+    
+    Returns:
+        shape (n,) array of XIRR percentages
+    """
+    today = today_epoch_day() if today is None else today
+    start_day = today - int(years * DAYS_PER_YEAR)
+    dates = sip_dates(start_day, today)
+    
+    flow_amounts, flow_days = [], []
+    for series in series_list:
+        if series is None or len(series) < 2 or series.days[0] > start_day:
+            flow_amounts.append([])
+            flow_days.append([])
+            continue
+        idx = np.searchsorted(series.days, dates, side='left')
+        idx = idx[idx < len(series)]
+        # One unit of currency per instalment, valued at the latest NAV
+        value = float(np.sum(1 / series.navs[idx])) * series.latest_nav
+        flow_amounts.append(np.append(np.full(len(idx), -1.0), value))
+        flow_days.append(np.append(series.days[idx], series.latest_day))
+    
+    if not series_list:
+        return np.empty(0)
+    return xirr_many(flow_amounts, flow_days) * 100
+
+
+def _iso(epoch_day: int) -> str:
+    return str(np.datetime64(epoch_day, 'D'))
+
+
+def _rounded(rate: float) -> Optional[float]:
+    return None if np.isnan(rate) else round(float(rate), 2)
+
+
+def backtest_schemes(scheme_codes: List[str], weights: Sequence[float], monthly_amount: float,
+                     start_date: date, end_date: Optional[date] = None,
+                     sip_day_of_month: Optional[int] = None) -> Dict:
+    """
+    Run backtest_sip on the NAV histories of MFApi schemes
+    
+    Histories come from the MFApi service cache/NAV store (fetched concurrently
+    if missing).
+    """
+    from mf_api_service import mf_api_service
+    
+    batch = mf_api_service.get_nav_series_batch(scheme_codes)
+    missing = [scheme_code for scheme_code in scheme_codes if not batch.get(scheme_code)]
+    if missing:
+        raise ValueError(f"No NAV history available for scheme(s): {', '.join(missing)}")
+    
+    end_day = to_epoch_day(end_date) if end_date else today_epoch_day()
+    return backtest_sip(
+        {scheme_code: batch[scheme_code] for scheme_code in scheme_codes},
+        weights, monthly_amount, to_epoch_day(start_date), end_day, sip_day_of_month
+    )
+
+# Made with Bob
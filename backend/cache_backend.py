@@ -0,0 +1,408 @@
+"""
+Cache Backend - Pluggable key/value caches for MFApi and fund data
+LocalLRUCache keeps entries in this process; SharedSQLiteCache keeps them in
+a SQLite file on /dev/shm so every gunicorn worker on the host shares one
+copy without running an external cache server
+"""
+
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import logging
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate memory footprint of a value in bytes
+    
+    Walks dicts, lists, tuples and sets (MFApi payloads are nested dicts/lists
+    of strings); shared objects are counted once.
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
+
+
+def _default_shared_path() -> str:
+    # /dev/shm is RAM-backed on Linux; fall back to the temp dir elsewhere
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'sip_advisor_cache.db')
+
+
+class CacheBackend(ABC):
+    """
+    Key/value cache interface
+    
+    Backends implement get/set/delete/keys/clear; dict-style access
+    (cache[key], key in cache, cache.items(), ...) is built on top of those.
+    """
+    
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+    
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value; ttl (seconds) overrides the backend's default expiry"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
+    
+    @abstractmethod
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+    
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        return {}
+    
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+    
+    def __delitem__(self, key: str):
+        self.delete(key)
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def __len__(self) -> int:
+        return len(self.keys())
+    
+    def pop(self, key: str, default: Any = None) -> Any:
+        value = self.get(key, default)
+        self.delete(key)
+        return value
+    
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over (key, value) pairs that are still present"""
+        for key in self.keys():
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                yield key, value
+
+
+class LocalLRUCache(CacheBackend):
+    """
+    Thread-safe in-process LRU cache with entry/byte limits and TTL expiry
+    
+    Each entry's size is measured once when it is stored (estimate_size by
+    default). Inserting past max_entries or max_bytes evicts least recently
+    used entries; expired entries are dropped on access and by a periodic sweep.
+    """
+    
+    SWEEP_EVERY_WRITES = 256
+    
+    def __init__(self, max_entries: Optional[int] = None, default_ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, expires_at or None, size in bytes)
+        self._bytes = 0
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._lock = threading.Lock()
+    
+    def _remove(self, key: str):
+        """Drop an entry and its byte count (caller holds the lock)"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+    
+    def _sweep_expired(self, now: float):
+        """Drop every expired entry (caller holds the lock)"""
+        expired = [key for key, (_, expires_at, _) in self._entries.items()
+                   if expires_at is not None and now >= expires_at]
+        for key in expired:
+            self._remove(key)
+        self._expirations += len(expired)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.monotonic()
+        expires_at = now + ttl if ttl is not None else None
+        # Measure outside the lock; large payloads take a moment to walk
+        size = self.sizeof(value) if self.max_bytes else 0
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                logger.warning(f"Not caching {key}: {size} bytes exceeds the {self.max_bytes} byte limit")
+                return
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            
+            self._writes += 1
+            if self._writes % self.SWEEP_EVERY_WRITES == 0:
+                self._sweep_expired(now)
+            
+            while ((self.max_entries and len(self._entries) > self.max_entries) or
+                   (self.max_bytes and self._bytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+    
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'local',
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
+
+
+class SharedSQLiteCache(CacheBackend):
+    """
+    Cross-process cache in a SQLite file (RAM-backed on /dev/shm)
+    
+    Values are pickled; each cache uses its own namespace in the shared file.
+    Expired rows are ignored on read and purged periodically on write, at which
+    point a namespace over max_bytes also drops the rows closest to expiry
+    (SQLite reads don't track recency, so this approximates oldest-first).
+    """
+    
+    PURGE_EVERY_WRITES = 500
+    
+    def __init__(self, namespace: str, path: Optional[str] = None, default_ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.namespace = namespace
+        self.path = path or os.environ.get('CACHE_SHARED_PATH') or _default_shared_path()
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        # Per-process counters; entries/bytes are read from the shared file
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._init_schema()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Cache contents are disposable, no need to fsync
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+    
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        conn.commit()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            row = self._connect().execute(
+                'SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?',
+                (self.namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed for {self.namespace}/{key}: {e}")
+            return default
+        
+        if not row or (row[1] is not None and time.time() >= row[1]):
+            self._misses += 1
+            return default
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Discarding unreadable shared cache entry {self.namespace}/{key}: {e}")
+            self._misses += 1
+            return default
+        self._hits += 1
+        return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (self.namespace, key, sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY_WRITES == 0:
+                conn.execute('DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                             (time.time(),))
+                if self.max_bytes:
+                    self._trim_to_limit(conn)
+            conn.commit()
+        except (sqlite3.Error, pickle.PicklingError) as e:
+            logger.warning(f"Shared cache write failed for {self.namespace}/{key}: {e}")
+    
+    def _trim_to_limit(self, conn: sqlite3.Connection):
+        """Delete rows closest to expiry until the namespace fits in max_bytes"""
+        rows = conn.execute(
+            'SELECT key, length(value) FROM cache_entries WHERE namespace = ? '
+            'ORDER BY expires_at IS NULL, expires_at',
+            (self.namespace,)
+        ).fetchall()
+        excess = sum(size for _, size in rows) - self.max_bytes
+        evicted = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            evicted.append((self.namespace, key))
+            excess -= size
+        if evicted:
+            conn.executemany('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', evicted)
+            self._evictions += len(evicted)
+    
+    def delete(self, key: str):
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (self.namespace, key))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache delete failed for {self.namespace}/{key}: {e}")
+    
+    def keys(self) -> List[str]:
+        try:
+            rows = self._connect().execute(
+                'SELECT key FROM cache_entries WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (self.namespace, time.time())
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache scan failed for {self.namespace}: {e}")
+            return []
+        return [row[0] for row in rows]
+    
+    def clear(self):
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM cache_entries WHERE namespace = ?', (self.namespace,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache clear failed for {self.namespace}: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entries, size = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(length(value)), 0) FROM cache_entries WHERE namespace = ?',
+                (self.namespace,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache stats failed for {self.namespace}: {e}")
+            entries, size = None, None
+        return {
+            'backend': 'shared',
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions
+        }
+
+
+def create_cache_backend(namespace: str, default_ttl: Optional[float] = None,
+                         max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> CacheBackend:
+    """
+    Create a cache for the backend selected by CACHE_BACKEND
+    
+    Args:
+        namespace: Cache name, keeps caches apart inside a shared backend
+        default_ttl: Default expiry in seconds (None = no expiry)
+        max_entries: Entry limit for the local backend
+        max_bytes: Size limit in bytes (measured in memory locally, pickled size when shared)
+    
+    Returns:
+        SharedSQLiteCache if CACHE_BACKEND=shared (and usable), else LocalLRUCache
+    """
+    backend = os.environ.get('CACHE_BACKEND', 'local').lower()
+    if backend == 'shared':
+        try:
+            return SharedSQLiteCache(namespace, default_ttl=default_ttl, max_bytes=max_bytes)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache unavailable, using a local cache for {namespace}: {e}")
+    elif backend != 'local':
+        logger.warning(f"Unknown CACHE_BACKEND '{backend}', using a local cache for {namespace}")
+    return LocalLRUCache(max_entries=max_entries, default_ttl=default_ttl, max_bytes=max_bytes)
+
+# Made with Bob
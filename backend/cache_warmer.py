@@ -0,0 +1,145 @@
+"""
+Cache Warmer - Background prefetch of every curated MFApi scheme
+Fetches and pre-ranks the GENERAL/INDEX/SECTOR scheme codes at startup and
+again after each daily NAV publication, so the first recommendation request
+after a deploy (or after new NAVs land) doesn't pay for a cold cache
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-worker lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+DEFAULT_LOCK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_warmer.lock')
+
+
+class CacheWarmer:
+    """Daemon thread that keeps the curated scheme caches warm"""
+    
+    # AMFI publishes NAVs by 11 PM IST; MFApi picks them up shortly after
+    NAV_REFRESH_TIME_IST = os.environ.get('NAV_REFRESH_TIME_IST', '23:45')
+    # Extra run in the morning to catch late publications
+    RETRY_REFRESH_TIME_IST = os.environ.get('NAV_RETRY_REFRESH_TIME_IST', '07:30')
+    
+    def __init__(self, service, lock_path: Optional[str] = None):
+        self.service = service
+        self.lock_path = lock_path or os.environ.get('CACHE_WARMER_LOCK', DEFAULT_LOCK_PATH)
+        self.last_run = None
+        self.last_stats = None
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def start(self):
+        """Start the warm-up thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mfapi-cache-warmer', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    @staticmethod
+    def _at_ist(day: datetime, hhmm: str) -> datetime:
+        hour, minute = (int(part) for part in hhmm.split(':'))
+        return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    
+    def next_refresh_time(self, now: Optional[datetime] = None) -> datetime:
+        """Next scheduled refresh (timezone-aware, IST)"""
+        now = now or datetime.now(IST)
+        candidates = []
+        for day_offset in (0, 1):
+            day = now + timedelta(days=day_offset)
+            for hhmm in (self.NAV_REFRESH_TIME_IST, self.RETRY_REFRESH_TIME_IST):
+                run_at = self._at_ist(day, hhmm)
+                if run_at > now:
+                    candidates.append(run_at)
+        return min(candidates)
+    
+    def _run(self):
+        # Startup warm-up: store hits are fine, only missing data goes upstream
+        self._warm_with_lock(not_before=None)
+        
+        while not self._stop.is_set():
+            run_at = self.next_refresh_time()
+            if self._stop.wait((run_at - datetime.now(IST)).total_seconds()):
+                break
+            # Anything fetched before this run may predate the new NAVs
+            self._warm_with_lock(not_before=run_at.astimezone().replace(tzinfo=None))
+    
+    def _warm_with_lock(self, not_before: Optional[datetime]):
+        """
+        Warm while holding a host-wide file lock
+        
+        Gunicorn workers take turns: the first does the upstream fetches and
+        fills the shared NAV store, the rest mostly read from the store.
+        """
+        lock_file = None
+        try:
+            if fcntl:
+                lock_file = open(self.lock_path, 'w')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.warm(not_before)
+        except Exception as e:
+            logger.error(f"Cache warm-up failed: {e}")
+        finally:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+    
+    def warm(self, not_before: Optional[datetime] = None) -> Dict:
+        """
+        Prefetch all curated schemes and pre-rank the curated code lists
+        
+        Returns:
+            Stats dict (schemes, fetched, elapsed_seconds)
+        """
+        started = time.monotonic()
+        service = self.service
+        scheme_codes = service.get_curated_scheme_codes()
+        
+        batch = service.fetch_funds_concurrently(scheme_codes, deadline=300, not_before=not_before)
+        fetched = sum(1 for fund_data in batch.values() if fund_data)
+        
+        # Pre-score the lists used by curated recommendations, index Top Picks and sectors
+        for codes in service.GENERAL_FUND_CODES.values():
+            service.rank_funds(codes)
+        service.rank_funds(service.get_curated_index_codes())
+        for codes in service.SECTOR_FUND_CODES.values():
+            service.rank_funds(codes)
+        
+        self.last_run = datetime.now()
+        self.last_stats = {
+            'schemes': len(batch),
+            'fetched': fetched,
+            'elapsed_seconds': round(time.monotonic() - started, 2)
+        }
+        logger.info(f"Cache warm-up complete: {self.last_stats}")
+        return self.last_stats
+
+
+_warmer = None
+
+
+def start_cache_warmer() -> CacheWarmer:
+    """Start the process-wide cache warmer for the global MFApi service"""
+    global _warmer
+    if _warmer is None:
+        from mf_api_service import mf_api_service
+        _warmer = CacheWarmer(mf_api_service)
+    _warmer.start()
+    return _warmer
+
+# Made with Bob
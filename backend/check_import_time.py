@@ -0,0 +1,108 @@
+"""
+Import Time Budget Check - Guards worker cold-start cost
+Imports the app in a fresh interpreter with -X importtime and fails if the
+total import time exceeds the budget or a heavy library that no startup code
+path needs (pandas, yfinance, scikit-learn, ...) gets pulled in
+
+Usage:
+    python check_import_time.py [--budget-ms 1500] [--module app] [--top 15]
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+from typing import List, Tuple
+
+# Libraries that must only be imported lazily, inside the code path that uses them
+FORBIDDEN_AT_STARTUP = ['pandas', 'yfinance', 'sklearn', 'scipy', 'matplotlib']
+
+DEFAULT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '1500'))
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_imports(module: str) -> Tuple[int, List[Tuple[str, int]], List[str]]:
+    """
+    Import a module in a fresh interpreter
+    
+    Returns:
+        (total microseconds, [(module's direct import, cumulative microseconds)],
+         [FORBIDDEN_AT_STARTUP libraries that got loaded])
+    """
+    probe = (
+        f'import sys, {module}; '
+        f'print(",".join(name for name in {FORBIDDEN_AT_STARTUP!r} if name in sys.modules))'
+    )
+    # Inherit the environment as is, so the measured configuration is the real one
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    
+    # Lines look like "import time:   412 |   1630 |   flask.app", nesting shown by indentation
+    timings = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative_us, indent, name = match.groups()
+            timings.append((name, int(cumulative_us), len(indent)))
+    
+    # Children are printed before their parent: collect the imports one level
+    # below the top until the target module's own line closes them
+    top_level_indent = min((indent for _, _, indent in timings), default=0)
+    total_us = 0
+    children = []
+    direct_imports = []
+    for name, cumulative_us, indent in timings:
+        if indent == top_level_indent:
+            total_us += cumulative_us
+            if name == module:
+                direct_imports = children
+            children = []
+        elif indent == top_level_indent + 2:
+            children.append((name, cumulative_us))
+    
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return total_us, direct_imports, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Check the import-time budget of the backend')
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Maximum total import time in milliseconds (default: IMPORT_BUDGET_MS or 1500)')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+    args = parser.parse_args()
+    
+    total_us, imports, loaded = measure_imports(args.module)
+    total_ms = total_us / 1000
+    
+    print(f"Import time for '{args.module}': {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Slowest imports made by '{args.module}':")
+    for name, cumulative_us in sorted(imports, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    
+    failed = False
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    
+    if loaded:
+        print(f"FAIL: heavy libraries imported at startup: {', '.join(loaded)}")
+        failed = True
+    
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# Made with Bob
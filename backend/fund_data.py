@@ -5,6 +5,7 @@ Fund Data Module - Fetches real-time fund data from MFApi with fallback
 import random
 from datetime import datetime, timedelta
 import logging
+from cache_backend import create_cache_backend
 
 class FundDataService:
     """
@@ -34,10 +35,10 @@ class FundDataService:
             'Axis Midcap Fund': 98.76,
             'Kotak Small Cap Fund': 234.12
         }
-        # Cache for MFApi NAV data
-        self._nav_cache = {}
+        # Cache for MFApi NAV data (shared by all workers with CACHE_BACKEND=shared)
+        self._nav_cache = create_cache_backend('fund_nav', default_ttl=6 * 60 * 60)
         # Cache for returns data to ensure consistency
-        self._returns_cache = {}
+        self._returns_cache = create_cache_backend('fund_returns')
     
     def get_current_nav(self, fund_name):
         """
@@ -45,8 +46,9 @@ class FundDataService:
         Tries MFApi first, falls back to static data
         """
         # Check cache first
-        if fund_name in self._nav_cache:
-            return self._nav_cache[fund_name]
+        cached_nav = self._nav_cache.get(fund_name)
+        if cached_nav is not None:
+            return cached_nav
         
         # Try to get from MFApi
         try:
@@ -61,6 +63,42 @@ class FundDataService:
         # Fallback to static data
         return self.fund_nav_data.get(fund_name, 100.00)
     
+    def get_current_navs(self, fund_names):
+        """
+        Get current NAVs for several funds in one pass
+        Uncached names are looked up on MFApi as a single concurrent batch;
+        anything not found falls back to static data like get_current_nav
+        
+        Returns:
+            Dict mapping fund name to NAV
+        """
+        navs = {}
+        missing = []
+        for fund_name in dict.fromkeys(fund_names):
+            cached_nav = self._nav_cache.get(fund_name)
+            if cached_nav is not None:
+                navs[fund_name] = cached_nav
+            else:
+                missing.append(fund_name)
+        
+        if missing:
+            try:
+                from mf_api_service import mf_api_service
+                api_navs = mf_api_service.get_navs_by_fund_names(missing)
+            except Exception as e:
+                logging.warning(f"MFApi batch NAV fetch failed: {e}")
+                api_navs = {}
+            
+            for fund_name in missing:
+                nav = api_navs.get(fund_name)
+                if nav:
+                    self._nav_cache[fund_name] = nav
+                    navs[fund_name] = nav
+                else:
+                    navs[fund_name] = self.fund_nav_data.get(fund_name, 100.00)
+        
+        return navs
+    
     def generate_performance_data(self, fund_name, period='1Y'):
         """
         Generate simulated performance data for different time periods
@@ -108,8 +146,9 @@ class FundDataService:
     def calculate_returns(self, fund_name):
         """Calculate returns for different periods - cached for consistency"""
         # Check cache first
-        if fund_name in self._returns_cache:
-            return self._returns_cache[fund_name]
+        cached = self._returns_cache.get(fund_name)
+        if cached is not None:
+            return cached
         
         current_nav = self.get_current_nav(fund_name)
         base_return = self._get_base_return(fund_name)
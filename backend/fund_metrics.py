@@ -0,0 +1,200 @@
+"""
+Fund Metrics - Per-scheme metrics derived in one pass over a NAV series
+Every endpoint reads 1Y return, 3Y CAGR, volatility, rolling returns, risk
+ratios and risk tier from the same SchemeMetrics row, so the numbers agree
+between recommendations, rankings and search results
+"""
+
+import os
+import logging
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from nav_series import DAYS_PER_YEAR, NavSeries, today_epoch_day
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Windows (years) of the rolling return statistics
+ROLLING_WINDOWS = (1, 3, 5)
+# Lookback (years) of drawdown, downside deviation and Sharpe/Sortino
+RISK_WINDOW_YEARS = 3
+# Annual risk-free rate (%) for Sharpe/Sortino, roughly the 91-day T-bill yield
+RISK_FREE_RATE = float(os.environ.get('RISK_FREE_RATE', '6.5'))
+
+# Category keywords checked in order (MFApi scheme_category); first match wins
+CATEGORY_RISK_TIERS = [
+    (('debt', 'liquid'), 'Low'),
+    (('hybrid', 'balanced'), 'Medium'),
+    (('large cap', 'bluechip'), 'Medium-High'),
+    (('mid cap', 'small cap'), 'High'),
+    (('sectoral', 'thematic'), 'Very High'),
+]
+
+# Annualized volatility (%) upper bounds for schemes whose category doesn't decide the tier
+VOLATILITY_RISK_TIERS = [
+    (5.0, 'Low'),
+    (12.0, 'Medium'),
+    (18.0, 'Medium-High'),
+    (25.0, 'High'),
+]
+
+
+class SchemeMetrics(NamedTuple):
+    """Metrics for one scheme as of `computed_on` (epoch day)"""
+    computed_on: int
+    latest_day: Optional[int]
+    latest_nav: Optional[float]
+    return_1y: Optional[float]     # Simple 1-year return, %
+    cagr_3y: Optional[float]       # 3-year CAGR, % (1-year CAGR if history is shorter)
+    cagr_years: Optional[int]      # Horizon cagr_3y was actually computed over
+    volatility: Optional[float]    # Annualized volatility of daily returns over the last year, %
+    risk_tier: str
+    # Rolling CAGRs (%) over every window of 1/3/5 years in the history:
+    # mean, worst, and share of windows with a positive return (%)
+    rolling_1y_mean: Optional[float] = None
+    rolling_1y_min: Optional[float] = None
+    rolling_1y_positive: Optional[float] = None
+    rolling_3y_mean: Optional[float] = None
+    rolling_3y_min: Optional[float] = None
+    rolling_3y_positive: Optional[float] = None
+    rolling_5y_mean: Optional[float] = None
+    rolling_5y_min: Optional[float] = None
+    rolling_5y_positive: Optional[float] = None
+    # Over the last RISK_WINDOW_YEARS (or the whole history if shorter, min. 1 year)
+    volatility_3y: Optional[float] = None        # Annualized, %
+    max_drawdown: Optional[float] = None         # Largest peak-to-trough fall, % (positive)
+    downside_deviation: Optional[float] = None   # Annualized, below the risk-free rate, %
+    sharpe_ratio: Optional[float] = None
+    sortino_ratio: Optional[float] = None
+
+
+def annualized_volatility(series: NavSeries, today: int, days_back: int = 365) -> Optional[float]:
+    """Annualized standard deviation (%) of daily log returns over the last `days_back` days"""
+    start = int(np.searchsorted(series.days, today - days_back, side='left'))
+    navs = series.navs[start:]
+    if len(navs) < 20:
+        return None
+    daily_returns = np.diff(np.log(navs))
+    return float(daily_returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR) * 100)
+
+
+def rolling_returns(series: NavSeries, years: int) -> np.ndarray:
+    """
+    CAGR (%) of every `years`-long window ending on a NAV date
+    
+    Each NAV date at least `years` after the first one is paired with the NAV
+    on or before the date `years` earlier, all with one searchsorted.
+    """
+    window_days = int(years * DAYS_PER_YEAR)
+    ends = np.flatnonzero(series.days >= series.days[0] + window_days)
+    if not len(ends):
+        return np.empty(0)
+    starts = np.searchsorted(series.days, series.days[ends] - window_days, side='right') - 1
+    elapsed_years = (series.days[ends] - series.days[starts]) / DAYS_PER_YEAR
+    return (np.power(series.navs[ends] / series.navs[starts], 1 / elapsed_years) - 1) * 100
+
+
+def max_drawdown(navs: np.ndarray) -> float:
+    """Largest fall (%) from a running peak"""
+    return float((1 - navs / np.maximum.accumulate(navs)).max() * 100)
+
+
+def risk_statistics(series: NavSeries, today: int, years: int = RISK_WINDOW_YEARS) -> Dict[str, Optional[float]]:
+    """
+    Volatility, drawdown, downside deviation and Sharpe/Sortino ratios over the last `years`
+    
+    Uses whatever history falls in the window, provided it spans at least a year.
+    """
+    start = int(np.searchsorted(series.days, today - int(years * DAYS_PER_YEAR), side='left'))
+    days, navs = series.days[start:], series.navs[start:]
+    if len(navs) < 20 or days[-1] - days[0] < DAYS_PER_YEAR * 0.9:
+        return {}
+    
+    daily_returns = navs[1:] / navs[:-1] - 1
+    volatility = float(np.diff(np.log(navs)).std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR) * 100)
+    risk_free_daily = (1 + RISK_FREE_RATE / 100) ** (1 / TRADING_DAYS_PER_YEAR) - 1
+    shortfall = np.minimum(daily_returns - risk_free_daily, 0)
+    downside_deviation = float(np.sqrt(np.mean(shortfall ** 2) * TRADING_DAYS_PER_YEAR) * 100)
+    
+    annual_return = float((navs[-1] / navs[0]) ** (DAYS_PER_YEAR / (days[-1] - days[0])) - 1) * 100
+    excess_return = annual_return - RISK_FREE_RATE
+    return {
+        'volatility_3y': round(volatility, 2),
+        'max_drawdown': round(max_drawdown(navs), 2),
+        'downside_deviation': round(downside_deviation, 2),
+        'sharpe_ratio': round(excess_return / volatility, 2) if volatility > 0 else None,
+        'sortino_ratio': round(excess_return / downside_deviation, 2) if downside_deviation > 0 else None
+    }
+
+
+def risk_tier(category: str, volatility: Optional[float]) -> str:
+    """Risk tier from the scheme category, falling back to measured volatility"""
+    category = (category or '').lower()
+    for keywords, tier in CATEGORY_RISK_TIERS:
+        if any(keyword in category for keyword in keywords):
+            return tier
+    
+    if volatility is None:
+        return 'Medium'
+    for upper_bound, tier in VOLATILITY_RISK_TIERS:
+        if volatility < upper_bound:
+            return tier
+    return 'Very High'
+
+
+def compute_metrics(series: Optional[NavSeries], category: str = '',
+                    today: Optional[int] = None) -> SchemeMetrics:
+    """
+    Derive every per-scheme metric from a NAV series
+    
+    Args:
+        series: Parsed NAV history (None or empty yields an all-None row)
+        category: MFApi scheme_category, used for the risk tier
+        today: Epoch day to compute as of (default: today)
+    
+    Returns:
+        SchemeMetrics row
+    """
+    today = today_epoch_day() if today is None else today
+    if series is None or len(series) < 2:
+        latest_nav = series.latest_nav if series is not None else None
+        latest_day = series.latest_day if series is not None else None
+        return SchemeMetrics(today, latest_day, latest_nav, None, None, None, None, risk_tier(category, None))
+    
+    return_1y = series.period_return(365, today)
+    
+    # Needs history covering at least 90% of the period; fall back to 1-year CAGR
+    cagr_years = 3
+    cagr = series.cagr(cagr_years, today)
+    if cagr is None:
+        cagr_years = 1
+        cagr = series.cagr(cagr_years, today)
+    if cagr is None:
+        cagr_years = None
+    
+    volatility = annualized_volatility(series, today)
+    
+    analytics = risk_statistics(series, today)
+    for years in ROLLING_WINDOWS:
+        windows = rolling_returns(series, years)
+        if len(windows):
+            analytics[f'rolling_{years}y_mean'] = round(float(windows.mean()), 2)
+            analytics[f'rolling_{years}y_min'] = round(float(windows.min()), 2)
+            analytics[f'rolling_{years}y_positive'] = round(float((windows > 0).mean() * 100), 2)
+    
+    return SchemeMetrics(
+        computed_on=today,
+        latest_day=series.latest_day,
+        latest_nav=series.latest_nav,
+        return_1y=round(return_1y, 2) if return_1y is not None else None,
+        cagr_3y=round(cagr, 2) if cagr is not None else None,
+        cagr_years=cagr_years,
+        volatility=round(volatility, 2) if volatility is not None else None,
+        risk_tier=risk_tier(category, volatility),
+        **analytics
+    )
+
+# Made with Bob
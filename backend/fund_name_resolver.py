@@ -0,0 +1,180 @@
+"""
+Fund Name Resolver - Maps display fund names to MFApi scheme codes
+Resolves names like 'HDFC Corporate Bond Fund' against the scheme master list
+(exact, then normalized, then fuzzy token match) and persists exact
+resolutions to disk, so NAV lookup by name is a dictionary hit plus at most
+one fetch
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-worker lock
+    fcntl = None
+
+from scheme_search import SchemeNameIndex, normalize_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fund_name_map.json')
+
+# Plan/option words that mark a variant we'd rather not show the NAV of
+NON_GROWTH_WORDS = {'idcw', 'dividend', 'bonus', 'payout', 'reinvestment'}
+
+
+class FundNameResolver:
+    """Fund name -> scheme code map backed by the scheme master name index"""
+    
+    FUZZY_CANDIDATES = 25
+    
+    def __init__(self, scheme_master, path: Optional[str] = None):
+        """
+        Args:
+            scheme_master: SchemeMasterService providing the name index
+            path: JSON file for persisted resolutions (default: FUND_NAME_MAP_PATH or backend/fund_name_map.json)
+        """
+        self.scheme_master = scheme_master
+        self.path = path if path is not None else os.environ.get('FUND_NAME_MAP_PATH', DEFAULT_MAP_PATH)
+        self._resolved: Dict[str, str] = self._read_from_disk()
+        # Fuzzy matches for the current index (not persisted; a better exact match may appear later)
+        self._fuzzy: Dict[str, str] = {}
+        self._fuzzy_index = None
+        # Names with no match in the current index (not persisted; the master list changes)
+        self._unresolved = set()
+        self._unresolved_index = None
+        self._lock = threading.Lock()
+    
+    def _read_from_disk(self) -> Dict[str, str]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path) as f:
+                return {str(name): str(code) for name, code in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Could not read fund name map {self.path}: {e}")
+            return {}
+    
+    def _write_to_disk(self, updates: Dict[str, str], removals: Iterable[str] = ()):
+        """
+        Merge changes into the on-disk map
+        
+        Other workers write the same file, so the current file is re-read under
+        an exclusive lock and only this call's changes are applied to it. The
+        write is atomic so readers never see a partial file. The merged map
+        (including other workers' resolutions) becomes this resolver's map.
+        """
+        if not self.path:
+            self._resolved.update(updates)
+            for fund_name in removals:
+                self._resolved.pop(fund_name, None)
+            return
+        lock_file = None
+        try:
+            if fcntl:
+                lock_file = open(f"{self.path}.lock", 'w')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            merged = self._read_from_disk()
+            merged.update(updates)
+            for fund_name in removals:
+                merged.pop(fund_name, None)
+            
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.fund_name_map_')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(merged, f, indent=0, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._resolved = merged
+        except OSError as e:
+            logger.warning(f"Could not write fund name map {self.path}: {e}")
+            self._resolved.update(updates)
+            for fund_name in removals:
+                self._resolved.pop(fund_name, None)
+        finally:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+    
+    @staticmethod
+    def _pick_variant(index: SchemeNameIndex, candidates: List[str]) -> str:
+        """Prefer growth options, then direct plans, keeping the index's ranking otherwise"""
+        def preference(position_and_code):
+            position, scheme_code = position_and_code
+            words = set(index.names[scheme_code].lower().replace('-', ' ').split())
+            return (bool(words & NON_GROWTH_WORDS), 'direct' not in words, position)
+        
+        return min(enumerate(candidates), key=preference)[1]
+    
+    def resolve(self, fund_name: str) -> Optional[str]:
+        """
+        Resolve a fund name to a scheme code
+        
+        Order: remembered resolution -> exact/normalized name -> fuzzy match
+        (every word of the name must match, see SchemeNameIndex.search).
+        Exact matches are persisted; fuzzy ones are only kept in memory until
+        the scheme master index is refreshed.
+        
+        Returns:
+            Scheme code, or None if the name can't be resolved
+        """
+        if not fund_name:
+            return None
+        
+        scheme_code = self._resolved.get(fund_name)
+        if scheme_code:
+            return scheme_code
+        
+        index = self.scheme_master.get_index()
+        if index is None:
+            return None
+        if index is self._fuzzy_index and fund_name in self._fuzzy:
+            return self._fuzzy[fund_name]
+        if index is self._unresolved_index and fund_name in self._unresolved:
+            return None
+        
+        scheme_code = index.find_exact(fund_name)
+        exact = scheme_code is not None
+        if not exact:
+            candidates = index.search(fund_name, limit=self.FUZZY_CANDIDATES)
+            if candidates:
+                # Only consider names containing the whole query phrase if any do
+                normalized = normalize_name(fund_name)
+                phrase_matches = [code for code in candidates if normalized in normalize_name(index.names[code])]
+                scheme_code = self._pick_variant(index, phrase_matches or candidates)
+        
+        with self._lock:
+            if scheme_code is None:
+                if index is not self._unresolved_index:
+                    self._unresolved_index = index
+                    self._unresolved = set()
+                self._unresolved.add(fund_name)
+                logger.info(f"No scheme found for fund name: {fund_name}")
+                return None
+            
+            if exact:
+                self._write_to_disk({fund_name: scheme_code})
+            else:
+                if index is not self._fuzzy_index:
+                    self._fuzzy_index = index
+                    self._fuzzy = {}
+                self._fuzzy[fund_name] = scheme_code
+        
+        match = 'exact' if exact else 'fuzzy'
+        logger.info(f"Resolved fund name '{fund_name}' to scheme {scheme_code} ({index.names.get(scheme_code)}, {match})")
+        return scheme_code
+    
+    def forget(self, fund_name: str):
+        """Drop a resolution that turned out to be wrong (e.g. the scheme was wound up)"""
+        with self._lock:
+            self._fuzzy.pop(fund_name, None)
+            if fund_name in self._resolved:
+                self._write_to_disk({}, removals=[fund_name])
+
+# Made with Bob
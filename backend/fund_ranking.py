@@ -0,0 +1,193 @@
+"""
+Fund Ranking - Weighted multi-criteria scoring of schemes
+Scores candidates on precomputed SchemeMetrics fields (CAGR, consistency,
+drawdown, volatility, ...) and selects the top k with a heap, so ranking a
+large candidate pool costs O(n log k) after one O(n) normalization pass
+"""
+
+import os
+import heapq
+import logging
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, TypeVar
+
+from fund_metrics import SchemeMetrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class Criterion(NamedTuple):
+    """A SchemeMetrics field to score on and which direction is better"""
+    field: str
+    higher_is_better: bool = True
+    # Rows the value is meaningful for; the value counts as missing for other rows
+    valid: Optional[Callable[[SchemeMetrics], bool]] = None
+
+
+def _full_cagr_horizon(metrics: SchemeMetrics) -> bool:
+    # cagr_3y falls back to a 1-year CAGR for young schemes; only score true 3-year values
+    return metrics.cagr_years == 3
+
+
+# Criteria available to weight; the name is what weights refer to
+CRITERIA: Dict[str, Criterion] = {
+    'cagr': Criterion('cagr_3y', valid=_full_cagr_horizon),
+    'return_1y': Criterion('return_1y'),
+    'rolling_return': Criterion('rolling_3y_mean'),
+    'consistency': Criterion('rolling_1y_positive'),    # Share of 1-year windows with a gain
+    'worst_year': Criterion('rolling_1y_min'),
+    'drawdown': Criterion('max_drawdown', higher_is_better=False),
+    'volatility': Criterion('volatility_3y', higher_is_better=False),
+    'downside_deviation': Criterion('downside_deviation', higher_is_better=False),
+    'sharpe': Criterion('sharpe_ratio'),
+    'sortino': Criterion('sortino_ratio'),
+}
+
+CRITERION_LABELS = {
+    'cagr': '3-year CAGR',
+    'return_1y': '1-year return',
+    'rolling_return': 'rolling 3-year return',
+    'worst_year': 'worst 1-year return',
+    'drawdown': 'max drawdown',
+    'sharpe': 'Sharpe ratio',
+    'sortino': 'Sortino ratio',
+}
+
+DEFAULT_WEIGHTS = {'cagr': 0.4, 'consistency': 0.2, 'drawdown': 0.2, 'volatility': 0.2}
+
+
+class RankedFund(NamedTuple):
+    scheme_code: str
+    score: float                 # 0..1, weighted share of the best value on each criterion
+    metrics: SchemeMetrics
+
+
+def top_k(items: Iterable[T], k: Optional[int], key: Callable[[T], Optional[float]]) -> List[T]:
+    """
+    The k items with the highest key (all items if k is None), best first
+    
+    Items whose key is None come after every item with a value. Ties keep
+    input order.
+    """
+    def ordering(item):
+        value = key(item)
+        return (value is not None, value if value is not None else 0.0)
+    
+    if k is None:
+        return sorted(items, key=ordering, reverse=True)
+    return heapq.nlargest(k, items, key=ordering)
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse 'cagr=0.5,drawdown=0.3,sharpe=0.2' into a weights dict"""
+    weights = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class FundRanker:
+    """Scores schemes on a weighted combination of metric criteria"""
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None,
+                 criteria: Optional[Dict[str, Criterion]] = None, min_coverage: float = 0.5):
+        """
+        Args:
+            weights: Criterion name -> weight (default: FUND_RANKING_WEIGHTS or DEFAULT_WEIGHTS)
+            criteria: Available criteria (default: CRITERIA); pass extra entries to plug in new fields
+            min_coverage: Minimum share of the total weight a scheme needs values for to be ranked
+        """
+        self.criteria = criteria if criteria is not None else CRITERIA
+        if weights is None:
+            spec = os.environ.get('FUND_RANKING_WEIGHTS')
+            weights = parse_weights(spec) if spec else DEFAULT_WEIGHTS
+        unknown = [name for name in weights if name not in self.criteria]
+        if unknown:
+            raise ValueError(f"Unknown ranking criteria: {', '.join(unknown)}")
+        if any(weight < 0 for weight in weights.values()) or sum(weights.values()) <= 0:
+            raise ValueError("Ranking weights must be non-negative and not all zero")
+        self.weights = {name: weight for name, weight in weights.items() if weight > 0}
+        self.min_coverage = min_coverage
+    
+    @property
+    def description(self) -> str:
+        """Human-readable scoring rule, e.g. '3-year CAGR 40%, consistency 20%'"""
+        total_weight = sum(self.weights.values())
+        return ', '.join(
+            f"{CRITERION_LABELS.get(name, name.replace('_', ' '))} {weight / total_weight:.0%}"
+            for name, weight in sorted(self.weights.items(), key=lambda item: -item[1])
+        )
+    
+    @property
+    def key(self) -> tuple:
+        """Hashable identity of the scoring rule (for memoizing rankings)"""
+        return tuple(sorted(self.weights.items())), self.min_coverage
+    
+    def score(self, metrics_by_code: Dict[str, Optional[SchemeMetrics]]) -> Dict[str, float]:
+        """
+        Score every scheme with enough data
+        
+        Each criterion is min-max normalized across the candidates (flipped
+        where lower is better). A scheme's score is the weighted mean over the
+        criteria it has values for, provided they carry at least min_coverage
+        of the total weight; other schemes are left out.
+        
+        Returns:
+            Dict scheme_code -> score in 0..1
+        """
+        total_weight = sum(self.weights.values())
+        weighted = {code: 0.0 for code, metrics in metrics_by_code.items() if metrics is not None}
+        covered = dict.fromkeys(weighted, 0.0)
+        
+        for name, weight in self.weights.items():
+            criterion = self.criteria[name]
+            values = {}
+            for code in weighted:
+                metrics = metrics_by_code[code]
+                value = getattr(metrics, criterion.field, None)
+                if value is not None and (criterion.valid is None or criterion.valid(metrics)):
+                    values[code] = value
+            if not values:
+                continue
+            low, high = min(values.values()), max(values.values())
+            spread = high - low
+            for code, value in values.items():
+                if not spread:
+                    goodness = 1.0
+                elif criterion.higher_is_better:
+                    goodness = (value - low) / spread
+                else:
+                    goodness = (high - value) / spread
+                weighted[code] += weight * goodness
+                covered[code] += weight
+        
+        return {
+            code: weighted[code] / covered[code]
+            for code in weighted
+            if covered[code] > 0 and covered[code] >= self.min_coverage * total_weight
+        }
+    
+    def rank(self, metrics_by_code: Dict[str, Optional[SchemeMetrics]], k: Optional[int] = None) -> List[RankedFund]:
+        """
+        The k best-scoring schemes (all scored schemes if k is None), best first
+        
+        Schemes without enough data are not returned.
+        """
+        return self.select(self.score(metrics_by_code), metrics_by_code, k)
+    
+    @staticmethod
+    def select(scores: Dict[str, float], metrics_by_code: Dict[str, Optional[SchemeMetrics]],
+               k: Optional[int] = None) -> List[RankedFund]:
+        """Top k of already computed scores (see score), best first"""
+        best = top_k(scores.items(), k, key=lambda item: item[1])
+        return [RankedFund(code, round(score, 4), metrics_by_code[code]) for code, score in best]
+
+
+# Global instance
+fund_ranker = FundRanker()
+
+# Made with Bob
@@ -182,6 +182,13 @@ class FundHoldingsService:
             logger.error(f"Error getting holdings: {e}")
             return None
     
+    def get_holdings_batch(self, funds: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Get holdings for a list of funds (same order as the input)
+        Holdings are inferred locally, so the whole list is answered in one pass
+        """
+        return [self.get_holdings(fund_data) for fund_data in funds]
+    
     def _infer_sector_from_name(self, fund_name: str) -> Optional[str]:
         """Infer sector from fund name"""
         sector_keywords = {
@@ -0,0 +1,159 @@
+"""
+HTTP Client - Shared connection-pooled session for MFApi calls
+Keeps TCP/TLS connections alive across requests, retries 5xx responses and
+timeouts with jittered exponential backoff, and trips a circuit breaker
+during outages so callers fail fast instead of waiting on timeouts
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised when a request is short-circuited because the upstream is failing"""
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker
+    
+    After `failure_threshold` consecutive failures the circuit opens and requests
+    fail immediately. Once `reset_timeout` seconds pass, one trial request is let
+    through (half-open); success closes the circuit, failure re-opens it.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def is_available(self) -> bool:
+        """Whether a request would currently be attempted (does not claim the half-open trial)"""
+        return self.state != self.OPEN
+    
+    def allow_request(self) -> bool:
+        """Claim permission to send a request"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: let a single trial request through
+            if self._trial_in_progress:
+                return False
+            self._state = self.HALF_OPEN
+            self._trial_in_progress = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit breaker closed: upstream recovered")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_progress = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class HttpClient:
+    """Thread-safe pooled HTTP client with retry/backoff and a circuit breaker"""
+    
+    POOL_SIZE = int(os.environ.get('MFAPI_POOL_SIZE', '16'))
+    MAX_RETRIES = int(os.environ.get('MFAPI_MAX_RETRIES', '2'))
+    BACKOFF_BASE = float(os.environ.get('MFAPI_BACKOFF_BASE', '0.5'))  # Seconds
+    BACKOFF_MAX = 8.0
+    BREAKER_FAILURES = int(os.environ.get('MFAPI_BREAKER_FAILURES', '5'))
+    BREAKER_RESET_SECONDS = float(os.environ.get('MFAPI_BREAKER_RESET', '30'))
+    
+    def __init__(self, pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+        self.breaker = breaker or CircuitBreaker(self.BREAKER_FAILURES, self.BREAKER_RESET_SECONDS)
+        
+        pool_size = pool_size or self.POOL_SIZE
+        self.session = requests.Session()
+        # Retries are handled here (with jitter) so urllib3's own retries are disabled
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)))
+    
+    def get(self, url: str, params: Optional[Dict] = None, timeout: float = 10) -> requests.Response:
+        """
+        GET with retries on 5xx/timeouts/connection errors
+        
+        Returns the response for any status below 500 (callers check status_code),
+        or the last 5xx response once retries are exhausted.
+        
+        Raises:
+            CircuitOpenError: the circuit is open, no request was sent
+            requests.RequestException: timeouts/connection errors after all retries,
+                or any other request error (not retried)
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open, skipping request to {url}")
+        
+        last_error = None
+        last_response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt - 1))
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                last_error = e
+                logger.warning(f"Request to {url} failed (attempt {attempt + 1}): {e}")
+                continue
+            except Exception:
+                # Not retryable (invalid URL, redirect loop, broken body, ...) but still a
+                # failure, so a half-open trial is never left in progress
+                self.breaker.record_failure()
+                raise
+            
+            if response.status_code < 500:
+                self.breaker.record_success()
+                return response
+            last_response = response
+            logger.warning(f"Request to {url} returned {response.status_code} (attempt {attempt + 1})")
+        
+        self.breaker.record_failure()
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+# Made with Bob
@@ -3,19 +3,57 @@ Mutual Fund API Service - Fetches live fund data with fallback to static data
 Uses MFApi (https://api.mfapi.in/) for real-time Indian mutual fund data
 """
 
-import requests
+import os
+import json
+import math
+import hashlib
 from typing import List, Dict, Optional
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
+from http_client import HttpClient
+from cache_backend import LocalLRUCache, create_cache_backend
+from nav_store import NavHistoryStore, create_nav_store
+from nav_series import NavSeries, today_epoch_day
+from fund_metrics import SchemeMetrics, compute_metrics
+from fund_ranking import FundRanker, RankedFund, fund_ranker, top_k
+from scheme_master import SchemeMasterService
+from scheme_search import SchemeNameIndex
+from fund_name_resolver import FundNameResolver
 
 logger = logging.getLogger(__name__)
 
+class _InFlightFetch:
+    """A scheme fetch in progress; concurrent callers for the same scheme wait on it"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
 class MFApiService:
     """Service to fetch mutual fund data from MFApi with caching and fallback"""
     
     BASE_URL = "https://api.mfapi.in"
     CACHE_DURATION = timedelta(hours=6)  # Cache data for 6 hours
     
+    # Concurrent fetch settings used when ranking a batch of scheme codes
+    FETCH_MAX_WORKERS = int(os.environ.get('MFAPI_FETCH_WORKERS', '8'))
+    BATCH_DEADLINE_SECONDS = float(os.environ.get('MFAPI_BATCH_DEADLINE', '15'))
+    
+    # Stale-while-revalidate: entries older than CACHE_DURATION but younger than this
+    # hard expiry are served immediately while a background refresh runs (0 disables)
+    STALE_MAX_AGE = timedelta(hours=float(os.environ.get('MFAPI_STALE_MAX_HOURS', '48')))
+    
+    # Stored histories are refreshed incrementally; force a full download this often
+    FULL_RESYNC_INTERVAL = timedelta(days=7)
+    # Memory budget for cached scheme payloads; least recently used schemes are evicted
+    CACHE_MAX_BYTES = int(float(os.environ.get('MFAPI_CACHE_MAX_MB', '128')) * 1024 * 1024)
+    # Parsed series / metrics rows kept per process
+    SERIES_MAX_ENTRIES = int(os.environ.get('MFAPI_SERIES_MAX_ENTRIES', '2000'))
+    # Payload key holding a digest of the NAV history (part of the cache signature)
+    DIGEST_KEY = '_history_digest'
+    
     # General/Non-Sector fund scheme codes (for low/medium/high risk profiles)
     # Expanded to support up to 15 funds in "All Available" mode
     GENERAL_FUND_CODES = {
@@ -247,50 +285,203 @@ class MFApiService:
         ]
     }
     
-    def __init__(self):
-        self.cache = {}
-        self.last_fetch = {}
-        self.api_available = True
-        self.last_api_check = None
+    def __init__(self, max_workers: Optional[int] = None, store: Optional[NavHistoryStore] = None,
+                 http_client: Optional[HttpClient] = None):
+        # Scheme payloads and fetch times (shared by all workers with CACHE_BACKEND=shared)
+        retention = max(self.CACHE_DURATION, self.STALE_MAX_AGE).total_seconds()
+        self.cache = create_cache_backend('mfapi_payloads', default_ttl=retention, max_bytes=self.CACHE_MAX_BYTES)
+        self.last_fetch = create_cache_backend('mfapi_fetched_at', default_ttl=retention)
+        self.last_full_sync = create_cache_backend('mfapi_full_sync', default_ttl=self.FULL_RESYNC_INTERVAL.total_seconds())
+        # Parsed NumPy NAV series per cached payload: cache_key -> (payload signature, NavSeries)
+        self.series = LocalLRUCache(max_entries=self.SERIES_MAX_ENTRIES)
+        # Per-scheme metrics table: scheme_code -> (payload signature, SchemeMetrics)
+        self.metrics = LocalLRUCache(max_entries=self.SERIES_MAX_ENTRIES)
+        # Memoized rankings: (scheme codes, ...) -> (day and payload signatures, ranking)
+        self.rankings = {}
+        # Pooled keep-alive session; its circuit breaker tracks API availability
+        self.http = http_client or HttpClient()
+        # Local copy of the /mf scheme master list (discovery, search, classification)
+        self.scheme_master = SchemeMasterService(self.BASE_URL, self.http)
+        # Persistent fund name -> scheme code map for NAV lookups by name
+        self.name_resolver = FundNameResolver(self.scheme_master)
+        self.max_workers = max_workers or self.FETCH_MAX_WORKERS
+        self._executor = None
+        # Single-flight bookkeeping: cache_key -> _InFlightFetch
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        # Background stale-while-revalidate refreshes
+        self._refresh_executor = None
+        self._refreshing = set()
+        # Persistent NAV store shared by all workers on this host
+        self.store = store if store is not None else create_nav_store()
     
-    def _is_cache_valid(self, key: str) -> bool:
-        """Check if cached data is still valid"""
-        if key not in self.cache or key not in self.last_fetch:
-            return False
-        return datetime.now() - self.last_fetch[key] < self.CACHE_DURATION
+    def _get_cached(self, key: str, not_before: Optional[datetime] = None) -> Optional[Dict]:
+        """Cached data if still valid (and fetched no earlier than not_before, if given), else None"""
+        fetched_at = self.last_fetch.get(key)
+        if fetched_at is None or (not_before and fetched_at < not_before):
+            return None
+        if datetime.now() - fetched_at >= self.CACHE_DURATION:
+            return None
+        return self.cache.get(key)
+    
+    def _is_cache_valid(self, key: str, not_before: Optional[datetime] = None) -> bool:
+        """Check if cached data is still valid (and fetched no earlier than not_before, if given)"""
+        return self._get_cached(key, not_before) is not None
+    
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        """Size and hit/miss/eviction stats of the scheme caches"""
+        return {
+            'payloads': self.cache.stats(),
+            'series': self.series.stats(),
+            'metrics': self.metrics.stats()
+        }
     
     def _check_api_availability(self) -> bool:
-        """Check if API is available"""
-        # Check every 5 minutes
-        if self.last_api_check and datetime.now() - self.last_api_check < timedelta(minutes=5):
-            return self.api_available
+        """
+        Check if API is available
         
-        try:
-            response = requests.get(f"{self.BASE_URL}/mf", timeout=5)
-            self.api_available = response.status_code == 200
-            self.last_api_check = datetime.now()
-            return self.api_available
-        except Exception as e:
-            logger.warning(f"API availability check failed: {e}")
-            self.api_available = False
-            self.last_api_check = datetime.now()
-            return False
+        Backed by the HTTP client's circuit breaker: the API counts as unavailable
+        only while the circuit is open after repeated upstream failures. No probe
+        request is needed; the next real request after the reset timeout is the trial.
+        """
+        available = self.http.breaker.is_available()
+        if not available:
+            logger.warning("MFApi circuit breaker is open, treating API as unavailable")
+        return available
     
-    def fetch_fund_details(self, scheme_code: str) -> Optional[Dict]:
-        """Fetch fund details from API"""
+    def fetch_fund_details(self, scheme_code: str, allow_stale: bool = True,
+                           not_before: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        Fetch fund details from API
+        
+        With allow_stale, data past CACHE_DURATION but within STALE_MAX_AGE is returned
+        immediately and refreshed in the background (stale-while-revalidate).
+        not_before treats anything fetched before that time as expired, e.g. to pick
+        up a newly published NAV; stale data is never served in that case.
+        
+        Stale histories are refreshed incrementally (only NAV points newer than the
+        latest stored date are downloaded); a full re-download happens when nothing
+        is stored, FULL_RESYNC_INTERVAL has passed, or upstream history was rewritten.
+        """
         cache_key = f"fund_{scheme_code}"
         
         # Return cached data if valid
-        if self._is_cache_valid(cache_key):
+        cached = self._get_cached(cache_key, not_before)
+        if cached is not None:
             logger.info(f"Returning cached data for scheme {scheme_code}")
-            return self.cache[cache_key]
+            return cached
+        
+        if allow_stale and not_before is None:
+            stale_data = self._get_stale_data(scheme_code)
+            if stale_data is not None:
+                if not self._is_cache_valid(cache_key):
+                    self._schedule_refresh(scheme_code)
+                return stale_data
+        
+        # Single-flight: concurrent misses for the same scheme share one upstream fetch
+        with self._inflight_lock:
+            cached = self._get_cached(cache_key, not_before)
+            if cached is not None:
+                return cached
+            inflight = self._inflight.get(cache_key)
+            is_leader = inflight is None
+            if is_leader:
+                inflight = _InFlightFetch()
+                self._inflight[cache_key] = inflight
+        
+        if not is_leader:
+            logger.info(f"Waiting for in-flight fetch of scheme {scheme_code}")
+            inflight.done.wait()
+            return inflight.result
         
         try:
-            response = requests.get(f"{self.BASE_URL}/mf/{scheme_code}", timeout=10)
+            inflight.result = self._load_fund_details(scheme_code, not_before)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_key, None)
+            inflight.done.set()
+        return inflight.result
+    
+    def _get_stale_data(self, scheme_code: str) -> Optional[Dict]:
+        """Cached or stored data younger than STALE_MAX_AGE (loaded into memory), else None"""
+        cache_key = f"fund_{scheme_code}"
+        now = datetime.now()
+        
+        cached = self.cache.get(cache_key)
+        fetched_at = self.last_fetch.get(cache_key)
+        if cached is not None and fetched_at and now - fetched_at < self.STALE_MAX_AGE:
+            return cached
+        
+        if self.store:
+            stored = self.store.get(scheme_code)
+            if stored and now - stored.fetched_at < self.STALE_MAX_AGE:
+                self.cache[cache_key] = stored.payload
+                self.last_fetch[cache_key] = stored.fetched_at
+                if stored.full_synced_at:
+                    self.last_full_sync[cache_key] = stored.full_synced_at
+                return stored.payload
+        return None
+    
+    def _schedule_refresh(self, scheme_code: str):
+        """Refresh a stale scheme in the background (at most one pending refresh per scheme)"""
+        with self._inflight_lock:
+            if scheme_code in self._refreshing:
+                return
+            self._refreshing.add(scheme_code)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mfapi-refresh')
+        
+        logger.info(f"Serving stale data for scheme {scheme_code}, refreshing in background")
+        self._refresh_executor.submit(self._refresh_in_background, scheme_code)
+    
+    def _refresh_in_background(self, scheme_code: str):
+        try:
+            self.fetch_fund_details(scheme_code, allow_stale=False)
+        except Exception as e:
+            logger.error(f"Background refresh failed for scheme {scheme_code}: {e}")
+        finally:
+            with self._inflight_lock:
+                self._refreshing.discard(scheme_code)
+    
+    def _load_fund_details(self, scheme_code: str, not_before: Optional[datetime] = None) -> Optional[Dict]:
+        """Load fund details from the NAV store or MFApi (called by one thread per scheme)"""
+        cache_key = f"fund_{scheme_code}"
+        
+        # Stale history to refresh from (in-memory copy, or the on-disk store if newer)
+        base_data = self.cache.get(cache_key)
+        base_fetched_at = self.last_fetch.get(cache_key)
+        full_synced_at = self.last_full_sync.get(cache_key)
+        
+        # Read through the on-disk store (survives restarts, shared across workers)
+        if self.store:
+            stored = self.store.get(scheme_code)
+            # Same-age rows count too: the in-memory payload may have been evicted while its
+            # fetch time is still remembered
+            if stored and (base_data is None or base_fetched_at is None or stored.fetched_at >= base_fetched_at):
+                base_data = stored.payload
+                full_synced_at = stored.full_synced_at
+                is_fresh = datetime.now() - stored.fetched_at < self.CACHE_DURATION
+                if is_fresh and (not_before is None or stored.fetched_at >= not_before):
+                    self._invalidate_rankings(scheme_code, self.cache.get(cache_key), stored.payload)
+                    self.cache[cache_key] = stored.payload
+                    self.last_fetch[cache_key] = stored.fetched_at
+                    if stored.full_synced_at:
+                        self.last_full_sync[cache_key] = stored.full_synced_at
+                    self.get_metrics(scheme_code, stored.payload)
+                    logger.info(f"Loaded scheme {scheme_code} from NAV store")
+                    return stored.payload
+        
+        if base_data and full_synced_at and datetime.now() - full_synced_at < self.FULL_RESYNC_INTERVAL:
+            data = self._fetch_incremental(scheme_code, base_data)
+            if data is not None:
+                self._save_fund_data(scheme_code, data)
+                return data
+        
+        try:
+            response = self.http.get(f"{self.BASE_URL}/mf/{scheme_code}", timeout=10)
             if response.status_code == 200:
                 data = response.json()
-                self.cache[cache_key] = data
-                self.last_fetch[cache_key] = datetime.now()
+                self._save_fund_data(scheme_code, data, full_sync=True)
                 logger.info(f"Fetched fresh data for scheme {scheme_code}")
                 return data
             else:
@@ -300,13 +491,188 @@ class MFApiService:
             logger.error(f"Error fetching fund {scheme_code}: {e}")
             return None
     
+    def _save_fund_data(self, scheme_code: str, data: Dict, full_sync: bool = False):
+        """Put fund data in the in-memory cache and the persistent store"""
+        cache_key = f"fund_{scheme_code}"
+        fetched_at = datetime.now()
+        self._stamp_digest(data)
+        self._invalidate_rankings(scheme_code, self.cache.get(cache_key), data)
+        self.cache[cache_key] = data
+        self.last_fetch[cache_key] = fetched_at
+        if full_sync:
+            self.last_full_sync[cache_key] = fetched_at
+        self._update_metrics(scheme_code, data)
+        if self.store:
+            self.store.put(scheme_code, data, fetched_at, full_synced_at=fetched_at if full_sync else None)
+    
+    @classmethod
+    def _stamp_digest(cls, fund_data: Dict):
+        """Record a digest of the NAV history in the payload (once per save, not per lookup)"""
+        history = json.dumps(fund_data.get('data') or [], separators=(',', ':')).encode()
+        fund_data[cls.DIGEST_KEY] = hashlib.blake2b(history, digest_size=16).hexdigest()
+    
+    @classmethod
+    def _payload_signature(cls, fund_data: Optional[Dict]) -> tuple:
+        """
+        Cheap identity of a payload's history (shared caches return copies, not the same object)
+        
+        Includes the content digest, so upstream revisions of past NAVs picked up
+        by a full resync change the signature even when length and latest date don't.
+        """
+        nav_data = (fund_data or {}).get('data') or []
+        return len(nav_data), nav_data[0].get('date') if nav_data else None, (fund_data or {}).get(cls.DIGEST_KEY)
+    
+    def _invalidate_rankings(self, scheme_code: str, previous: Optional[Dict], data: Dict):
+        """Drop memoized rankings that include a scheme whose NAV history changed"""
+        if self._payload_signature(previous) == self._payload_signature(data):
+            return
+        for ranking_key in list(self.rankings):
+            if scheme_code in ranking_key[0]:
+                self.rankings.pop(ranking_key, None)
+    
+    def _fetch_incremental(self, scheme_code: str, base_data: Dict) -> Optional[Dict]:
+        """
+        Download only NAV points published since the latest stored date and merge them
+        
+        Returns:
+            Merged fund data, or None if a full re-download is needed
+        """
+        history = base_data.get('data') or []
+        if not history:
+            return None
+        latest = history[0]
+        
+        try:
+            start_date = datetime.strptime(latest['date'], '%d-%m-%Y').strftime('%Y-%m-%d')
+            response = self.http.get(
+                f"{self.BASE_URL}/mf/{scheme_code}",
+                params={'startDate': start_date},
+                timeout=10
+            )
+            if response.status_code != 200:
+                logger.warning(f"Incremental refresh returned status {response.status_code} for scheme {scheme_code}")
+                return None
+            payload = response.json()
+            recent = payload.get('data') or []
+            
+            # Points are newest first; everything before the stored latest date is new
+            new_points = []
+            for entry in recent:
+                if entry.get('date') == latest['date']:
+                    if float(entry['nav']) != float(latest['nav']):
+                        logger.info(f"NAV history for scheme {scheme_code} was revised upstream, doing full resync")
+                        return None
+                    break
+                new_points.append(entry)
+            else:
+                # Stored latest point no longer exists upstream
+                logger.info(f"Stored NAV history for scheme {scheme_code} not found upstream, doing full resync")
+                return None
+        except Exception as e:
+            logger.warning(f"Incremental refresh failed for scheme {scheme_code}: {e}")
+            return None
+        
+        merged = dict(payload)
+        merged['data'] = new_points + history
+        logger.info(f"Merged {len(new_points)} new NAV points for scheme {scheme_code}")
+        return merged
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the shared worker pool used for batch fetches"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='mfapi-fetch'
+            )
+        return self._executor
+    
+    def fetch_funds_concurrently(self, scheme_codes: List[str], deadline: Optional[float] = None,
+                                 not_before: Optional[datetime] = None) -> Dict[str, Optional[Dict]]:
+        """
+        Fetch details for many schemes in parallel using a bounded worker pool
+        
+        Cached schemes are answered directly; only cache misses are sent to the pool.
+        Fetches still running when the batch deadline expires are reported as None
+        (they keep running in the background and will populate the cache).
+        
+        Args:
+            scheme_codes: List of AMFI scheme codes (duplicates are ignored)
+            deadline: Seconds to wait for the whole batch (default: BATCH_DEADLINE_SECONDS)
+            not_before: Treat data fetched before this time as expired (see fetch_fund_details)
+        
+        Returns:
+            Dict mapping scheme_code to fund data (None if unavailable)
+        """
+        results = {}
+        pending = []
+        
+        for scheme_code in dict.fromkeys(scheme_codes):
+            cached = self._get_cached(f"fund_{scheme_code}", not_before)
+            if cached is not None:
+                results[scheme_code] = cached
+            else:
+                pending.append(scheme_code)
+        
+        if not pending:
+            return results
+        
+        if deadline is None:
+            deadline = self.BATCH_DEADLINE_SECONDS
+        
+        executor = self._get_executor()
+        futures = {
+            executor.submit(self.fetch_fund_details, scheme_code, not_before=not_before): scheme_code
+            for scheme_code in pending
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        
+        for future in done:
+            scheme_code = futures[future]
+            try:
+                results[scheme_code] = future.result()
+            except Exception as e:
+                logger.error(f"Error fetching fund {scheme_code}: {e}")
+                results[scheme_code] = None
+        
+        for future in not_done:
+            future.cancel()
+            results[futures[future]] = None
+        
+        if not_done:
+            logger.warning(f"Batch deadline of {deadline}s hit: {len(not_done)} of {len(pending)} fetches unfinished")
+        logger.info(f"Fetched {len(done)} schemes concurrently ({len(results) - len(pending)} from cache)")
+        return results
+    
+    def get_curated_index_codes(self) -> List[str]:
+        """Curated large/mid cap index fund codes used for index Top Picks"""
+        return list(dict.fromkeys(
+            self.INDEX_FUND_CODES.get('large_cap', []) +
+            self.INDEX_FUND_CODES.get('mid_cap', [])
+        ))
+    
+    def get_curated_scheme_codes(self) -> List[str]:
+        """Every scheme code in GENERAL_FUND_CODES, INDEX_FUND_CODES and SECTOR_FUND_CODES"""
+        scheme_codes = []
+        for code_groups in (self.GENERAL_FUND_CODES, self.INDEX_FUND_CODES, self.SECTOR_FUND_CODES):
+            for codes in code_groups.values():
+                scheme_codes.extend(codes)
+        return list(dict.fromkeys(scheme_codes))
+    
+    def get_scheme_index(self) -> Optional[SchemeNameIndex]:
+        """Get the name search index over the scheme master list"""
+        return self.scheme_master.get_index()
+    
     def get_sector_funds_dynamic(self, sector: str) -> List[Dict]:
-        """Get funds for a sector from API"""
+        """Get funds for a sector from API, best multi-criteria score first"""
         if sector not in self.SECTOR_FUND_CODES:
             return []
         
+        # Scored funds in rank order, then the rest (too little history) in list order
+        ranked = {fund.scheme_code: fund for fund in self.rank_funds(self.SECTOR_FUND_CODES[sector])}
+        scheme_codes = list(ranked) + [code for code in self.SECTOR_FUND_CODES[sector] if code not in ranked]
+        
         funds = []
-        for scheme_code in self.SECTOR_FUND_CODES[sector]:
+        for scheme_code in scheme_codes:
             fund_data = self.fetch_fund_details(scheme_code)
             if fund_data:
                 # Parse and format fund data
@@ -319,11 +685,14 @@ class MFApiService:
                         'nav': latest_nav,
                         'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
                         'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                        'expected_return': self._estimate_returns(fund_data),
-                        'risk_level': self._estimate_risk(fund_data),
+                        'expected_return': self._estimate_returns(fund_data, scheme_code),
+                        'risk_level': self._estimate_risk(fund_data, scheme_code),
                         'is_dynamic': True,
                         'data_source': 'MFApi'
                     }
+                    if scheme_code in ranked:
+                        fund_info['cagr_3y'] = ranked[scheme_code].metrics.cagr_3y
+                        fund_info['ranking_score'] = ranked[scheme_code].score
                     funds.append(fund_info)
                 except Exception as e:
                     logger.error(f"Error parsing fund data for {scheme_code}: {e}")
@@ -331,44 +700,60 @@ class MFApiService:
         
         return funds
     
-    def _estimate_returns(self, fund_data: Dict) -> float:
-        """Estimate expected returns based on historical NAV data"""
+    def _update_metrics(self, scheme_code: str, fund_data: Dict) -> Optional[SchemeMetrics]:
+        """Derive and store all metrics for a freshly loaded history in one pass"""
         try:
-            if not fund_data.get('data') or len(fund_data['data']) < 365:
-                return 12.0  # Default return
-            
-            # Calculate 1-year return
-            current_nav = float(fund_data['data'][0]['nav'])
-            year_ago_nav = float(fund_data['data'][min(365, len(fund_data['data'])-1)]['nav'])
-            
-            if year_ago_nav > 0:
-                return_pct = ((current_nav - year_ago_nav) / year_ago_nav) * 100
-                return round(return_pct, 2)
-            return 12.0
+            series = self.get_nav_series(scheme_code, fund_data)
+            category = fund_data.get('meta', {}).get('scheme_category', '')
+            metrics = compute_metrics(series, category)
         except Exception as e:
-            logger.error(f"Error calculating returns: {e}")
-            return 12.0
+            logger.error(f"Error computing metrics for {scheme_code}: {e}")
+            return None
+        signature = self._payload_signature(fund_data)
+        self.metrics[scheme_code] = (signature, metrics)
+        if self.store:
+            self.store.put_metrics(scheme_code, signature, metrics._asdict())
+        return metrics
     
-    def _estimate_risk(self, fund_data: Dict) -> str:
-        """Estimate risk level based on fund category and volatility"""
-        try:
-            category = fund_data.get('meta', {}).get('scheme_category', '').lower()
-            
-            if 'debt' in category or 'liquid' in category:
-                return 'Low'
-            elif 'hybrid' in category or 'balanced' in category:
-                return 'Medium'
-            elif 'large cap' in category or 'bluechip' in category:
-                return 'Medium-High'
-            elif 'mid cap' in category or 'small cap' in category:
-                return 'High'
-            elif 'sectoral' in category or 'thematic' in category:
-                return 'Very High'
-            else:
-                return 'Medium'
-        except Exception as e:
-            logger.error(f"Error estimating risk: {e}")
-            return 'Medium'
+    def get_metrics(self, scheme_code: str, fund_data: Optional[Dict] = None) -> Optional[SchemeMetrics]:
+        """
+        Get the metrics row for a scheme
+        
+        Rows are computed when a history is refreshed and kept in memory and in
+        the NAV store; they're only recomputed here if the payload changed or
+        the row was computed on an earlier day.
+        """
+        if fund_data is None:
+            fund_data = self.fetch_fund_details(scheme_code)
+        if not fund_data:
+            return None
+        
+        signature = self._payload_signature(fund_data)
+        today = today_epoch_day()
+        stored = self.metrics.get(scheme_code)
+        if stored and stored[0] == signature and stored[1].computed_on == today:
+            return stored[1]
+        
+        # Another worker (or an earlier run) may already have derived this row
+        if self.store:
+            row = self.store.get_metrics(scheme_code)
+            if row and row[0] == signature and row[1].get('computed_on') == today:
+                metrics = SchemeMetrics(**{field: row[1].get(field) for field in SchemeMetrics._fields})
+                self.metrics[scheme_code] = (signature, metrics)
+                return metrics
+        return self._update_metrics(scheme_code, fund_data)
+    
+    def _estimate_returns(self, fund_data: Dict, scheme_code: str) -> float:
+        """Expected return: the scheme's 1-year return (12% if under a year of history)"""
+        metrics = self.get_metrics(scheme_code, fund_data)
+        if metrics is None or metrics.return_1y is None:
+            return 12.0  # Default return
+        return metrics.return_1y
+    
+    def _estimate_risk(self, fund_data: Dict, scheme_code: str) -> str:
+        """Risk tier based on fund category, falling back to volatility"""
+        metrics = self.get_metrics(scheme_code, fund_data)
+        return metrics.risk_tier if metrics else 'Medium'
     
     def calculate_cagr(self, scheme_code: str, years: int = 3) -> Optional[float]:
         """
@@ -381,82 +766,166 @@ class MFApiService:
         Returns:
             CAGR as percentage (e.g., 15.5 for 15.5% CAGR) or None if data unavailable
         """
-        try:
+        fund_data = self.fetch_fund_details(scheme_code)
+        return self._calculate_cagr_from_data(fund_data, scheme_code, years)
+    
+    def get_nav_series(self, scheme_code: str, fund_data: Optional[Dict] = None) -> Optional[NavSeries]:
+        """
+        Get the parsed NAV series for a scheme
+        
+        The series is parsed once per fetched payload and reused until the
+        payload in the cache is replaced by a refresh.
+        """
+        if fund_data is None:
             fund_data = self.fetch_fund_details(scheme_code)
-            if not fund_data or 'data' not in fund_data or len(fund_data['data']) < 2:
+        if not fund_data or not fund_data.get('data'):
+            return None
+        
+        cache_key = f"fund_{scheme_code}"
+        signature = self._payload_signature(fund_data)
+        cached = self.series.get(cache_key)
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        series = NavSeries.from_mfapi(fund_data['data'])
+        self.series[cache_key] = (signature, series)
+        return series
+    
+    def get_nav_series_batch(self, scheme_codes: List[str]) -> Dict[str, Optional[NavSeries]]:
+        """
+        Get NAV series for many schemes, fetching missing histories concurrently
+        
+        Returns:
+            Dict mapping each scheme code to its series (None if unavailable)
+        """
+        batch = self.fetch_funds_concurrently(scheme_codes)
+        return {
+            scheme_code: self.get_nav_series(scheme_code, batch[scheme_code]) if batch.get(scheme_code) else None
+            for scheme_code in dict.fromkeys(scheme_codes)
+        }
+    
+    def _calculate_cagr_from_data(self, fund_data: Optional[Dict], scheme_code: str, years: int = 3) -> Optional[float]:
+        """Calculate CAGR from already-fetched fund data (see calculate_cagr)"""
+        if years == 3:
+            # Precomputed (with the same 1-year fallback) in the metrics table
+            metrics = self.get_metrics(scheme_code, fund_data) if fund_data else None
+            return metrics.cagr_3y if metrics else None
+        
+        try:
+            series = self.get_nav_series(scheme_code, fund_data)
+            if series is None or len(series) < 2:
                 return None
             
-            # Get current NAV (most recent)
-            current_nav = float(fund_data['data'][0]['nav'])
-            
-            # Calculate days for the period
-            days_needed = years * 365
-            
-            # Find NAV closest to N years ago
-            target_date = datetime.now() - timedelta(days=days_needed)
-            old_nav = None
-            actual_days = 0
-            
-            for entry in reversed(fund_data['data']):
-                entry_date = datetime.strptime(entry['date'], '%d-%m-%Y')
-                if entry_date <= target_date:
-                    old_nav = float(entry['nav'])
-                    actual_days = (datetime.now() - entry_date).days
-                    break
-            
-            if not old_nav or actual_days < (years * 365 * 0.9):  # At least 90% of target period
-                # Try 1-year CAGR as fallback
-                if years > 1:
-                    return self.calculate_cagr(scheme_code, years=1)
+            # Needs history covering at least 90% of the period; fall back to 1-year CAGR
+            cagr = series.cagr(years)
+            if cagr is None and years > 1:
+                years = 1
+                cagr = series.cagr(years)
+            if cagr is None:
                 return None
             
-            # Calculate CAGR: ((Current/Old)^(1/years)) - 1
-            actual_years = actual_days / 365.0
-            cagr = (pow(current_nav / old_nav, 1 / actual_years) - 1) * 100
-            
-            logger.info(f"CAGR for {scheme_code}: {cagr:.2f}% over {actual_years:.1f} years")
+            logger.info(f"CAGR for {scheme_code}: {cagr:.2f}% over {years} years")
             return round(cagr, 2)
             
         except Exception as e:
             logger.error(f"Error calculating CAGR for {scheme_code}: {e}")
             return None
     
-    def rank_funds_by_performance(self, scheme_codes: List[str]) -> List[tuple[str, float]]:
+    def rank_funds_by_performance(self, scheme_codes: List[str], years: int = 3,
+                                  by: str = 'cagr') -> List[tuple[str, Optional[float]]]:
         """
-        Rank funds by 3-year CAGR performance
+        Rank funds by CAGR performance (3-year by default)
+        
+        All scheme histories are fetched concurrently first, so a cold-cache
+        ranking costs roughly one upstream round trip instead of one per fund.
+        Rankings are memoized per (code list, horizon, measure) and reused until a
+        member's latest NAV date changes (or the calendar day rolls over).
         
         Args:
             scheme_codes: List of AMFI scheme codes
+            years: CAGR horizon in years
+            by: 'cagr' (point-to-point) or 'sip_xirr' (XIRR of a monthly SIP over the same horizon)
             
         Returns:
-            List of (scheme_code, cagr) tuples sorted by CAGR (highest first)
+            List of (scheme_code, return % or None) tuples sorted highest first
+            (funds without enough history last)
         """
-        fund_performance = []
+        if by not in ('cagr', 'sip_xirr'):
+            raise ValueError("by must be 'cagr' or 'sip_xirr'")
         
-        for scheme_code in scheme_codes:
-            cagr = self.calculate_cagr(scheme_code, years=3)
-            if cagr is not None:
-                fund_performance.append((scheme_code, cagr))
-            else:
-                # If CAGR unavailable, assign low score to put at end
-                fund_performance.append((scheme_code, -999.0))
+        batch = self.fetch_funds_concurrently(scheme_codes)
         
-        # Sort by CAGR (highest first)
-        fund_performance.sort(key=lambda x: x[1], reverse=True)
+        ranking_key = (tuple(scheme_codes), years, by)
+        signature = (today_epoch_day(), tuple(self._payload_signature(batch.get(code)) for code in scheme_codes))
+        memoized = self.rankings.get(ranking_key)
+        if memoized and memoized[0] == signature:
+            return list(memoized[1])
         
-        logger.info(f"Ranked {len(fund_performance)} funds by performance")
-        return fund_performance
+        if by == 'sip_xirr':
+            from backtest import trailing_sip_xirr_many
+            
+            series_list = [self.get_nav_series(code, batch[code]) if batch.get(code) else None for code in scheme_codes]
+            returns = [None if math.isnan(xirr) else round(float(xirr), 2)
+                       for xirr in trailing_sip_xirr_many(series_list, years)]
+        else:
+            returns = [self._calculate_cagr_from_data(batch.get(code), code, years=years) for code in scheme_codes]
+        
+        # Highest return first; funds without enough history go last
+        fund_performance = top_k(zip(scheme_codes, returns), None, key=lambda x: x[1])
+        self.rankings[ranking_key] = (signature, fund_performance)
+        
+        logger.info(f"Ranked {len(fund_performance)} funds by performance ({by})")
+        return list(fund_performance)
+    
+    def rank_funds(self, scheme_codes: List[str], k: Optional[int] = None,
+                   ranker: Optional[FundRanker] = None) -> List[RankedFund]:
+        """
+        Select the k best schemes by weighted multi-criteria score
+        
+        Scores come from the precomputed metrics rows (see fund_ranking), so
+        ranking is one metrics lookup per scheme plus an O(n log k) selection.
+        Histories are fetched concurrently first and scores are memoized like
+        rank_funds_by_performance rankings.
+        
+        Args:
+            scheme_codes: Candidate AMFI scheme codes
+            k: Number of schemes to return (default: every scheme with enough data)
+            ranker: Scoring rule (default: the global fund_ranker)
+        
+        Returns:
+            List of RankedFund(scheme_code, score, metrics), best first; schemes
+            without enough data are left out
+        """
+        ranker = ranker or fund_ranker
+        batch = self.fetch_funds_concurrently(scheme_codes)
+        
+        # Scores are memoized for the code list; each call only runs the top-k selection
+        ranking_key = (tuple(scheme_codes), 'score', ranker.key)
+        signature = (today_epoch_day(), tuple(self._payload_signature(batch.get(code)) for code in scheme_codes))
+        memoized = self.rankings.get(ranking_key)
+        if memoized and memoized[0] == signature:
+            return ranker.select(*memoized[1], k)
+        
+        metrics_by_code = {
+            scheme_code: self.get_metrics(scheme_code, batch[scheme_code]) if batch.get(scheme_code) else None
+            for scheme_code in scheme_codes
+        }
+        scores = ranker.score(metrics_by_code)
+        self.rankings[ranking_key] = (signature, (scores, metrics_by_code))
+        ranked = ranker.select(scores, metrics_by_code, k)
+        
+        logger.info(f"Scored {len(metrics_by_code)} funds, selected {len(ranked)}")
+        return list(ranked)
     
     def get_general_funds_curated(self, risk_profile: str, max_funds: int = 15) -> tuple[List[Dict], bool]:
         """
-        Get TOP PERFORMING general funds using 3-year CAGR ranking
+        Get TOP PERFORMING general funds using multi-criteria ranking
         Used when fund_selection_mode='curated' and no sectors selected
         
         This method:
         1. Fetches ALL available funds from GENERAL_FUND_CODES
-        2. Calculates 3-year CAGR for each fund
-        3. Ranks funds by performance (highest CAGR first)
-        4. Selects top N funds based on risk profile allocation
+        2. Scores each fund on its metrics (3-year CAGR, consistency, drawdown, volatility)
+        3. Selects the top N funds of each category based on risk profile allocation
         
         Args:
             risk_profile: 'low_risk', 'medium_risk', or 'high_risk'
@@ -491,91 +960,30 @@ class MFApiService:
             hybrid_count = max(1, int(hybrid_count * max_funds / total))
             equity_count = max_funds - debt_count - hybrid_count
         
-        logger.info(f"Ranking funds by 3-year CAGR: {debt_count} debt, {hybrid_count} hybrid, {equity_count} equity")
+        logger.info(f"Ranking funds by score: {debt_count} debt, {hybrid_count} hybrid, {equity_count} equity")
+        
+        # Warm all three categories in a single concurrent batch
+        self.fetch_funds_concurrently(
+            self.GENERAL_FUND_CODES['debt'] +
+            self.GENERAL_FUND_CODES['hybrid'] +
+            self.GENERAL_FUND_CODES['equity']
+        )
         
         all_funds = []
         
-        # Rank and fetch debt funds
-        debt_ranked = self.rank_funds_by_performance(self.GENERAL_FUND_CODES['debt'])
-        for scheme_code, cagr in debt_ranked[:debt_count]:
-            if cagr > -999:  # Skip funds with no CAGR data
-                fund_data = self.fetch_fund_details(scheme_code)
+        # Top funds of each category by multi-criteria score
+        for category, count, default_type in [('debt', debt_count, 'Debt Fund'),
+                                              ('hybrid', hybrid_count, 'Hybrid Fund'),
+                                              ('equity', equity_count, 'Equity Fund')]:
+            for ranked in self.rank_funds(self.GENERAL_FUND_CODES[category], k=count):
+                fund_data = self.fetch_fund_details(ranked.scheme_code)
                 if fund_data:
-                    # Parse fund data into standard format
-                    try:
-                        latest_nav = float(fund_data['data'][0]['nav']) if fund_data.get('data') else 0
-                        fund_info = {
-                            'name': fund_data.get('meta', {}).get('scheme_name', 'Unknown Fund'),
-                            'type': fund_data.get('meta', {}).get('scheme_category', 'Debt Fund'),
-                            'scheme_code': scheme_code,
-                            'nav': latest_nav,
-                            'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
-                            'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                            'expected_return': self._estimate_returns(fund_data),
-                            'risk_level': self._estimate_risk(fund_data),
-                            'cagr_3y': cagr,
-                            'is_dynamic': True,
-                            'data_source': 'MFApi'
-                        }
-                        all_funds.append(fund_info)
-                    except Exception as e:
-                        logger.error(f"Error parsing debt fund {scheme_code}: {e}")
-                        continue
-        
-        # Rank and fetch hybrid funds
-        hybrid_ranked = self.rank_funds_by_performance(self.GENERAL_FUND_CODES['hybrid'])
-        for scheme_code, cagr in hybrid_ranked[:hybrid_count]:
-            if cagr > -999:
-                fund_data = self.fetch_fund_details(scheme_code)
-                if fund_data:
-                    try:
-                        latest_nav = float(fund_data['data'][0]['nav']) if fund_data.get('data') else 0
-                        fund_info = {
-                            'name': fund_data.get('meta', {}).get('scheme_name', 'Unknown Fund'),
-                            'type': fund_data.get('meta', {}).get('scheme_category', 'Hybrid Fund'),
-                            'scheme_code': scheme_code,
-                            'nav': latest_nav,
-                            'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
-                            'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                            'expected_return': self._estimate_returns(fund_data),
-                            'risk_level': self._estimate_risk(fund_data),
-                            'cagr_3y': cagr,
-                            'is_dynamic': True,
-                            'data_source': 'MFApi'
-                        }
-                        all_funds.append(fund_info)
-                    except Exception as e:
-                        logger.error(f"Error parsing hybrid fund {scheme_code}: {e}")
-                        continue
-        
-        # Rank and fetch equity funds
-        equity_ranked = self.rank_funds_by_performance(self.GENERAL_FUND_CODES['equity'])
-        for scheme_code, cagr in equity_ranked[:equity_count]:
-            if cagr > -999:
-                fund_data = self.fetch_fund_details(scheme_code)
-                if fund_data:
-                    try:
-                        latest_nav = float(fund_data['data'][0]['nav']) if fund_data.get('data') else 0
-                        fund_info = {
-                            'name': fund_data.get('meta', {}).get('scheme_name', 'Unknown Fund'),
-                            'type': fund_data.get('meta', {}).get('scheme_category', 'Equity Fund'),
-                            'scheme_code': scheme_code,
-                            'nav': latest_nav,
-                            'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
-                            'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                            'expected_return': self._estimate_returns(fund_data),
-                            'risk_level': self._estimate_risk(fund_data),
-                            'cagr_3y': cagr,
-                            'is_dynamic': True,
-                            'data_source': 'MFApi'
-                        }
-                        all_funds.append(fund_info)
-                    except Exception as e:
-                        logger.error(f"Error parsing equity fund {scheme_code}: {e}")
-                        continue
+                    parsed_fund = self._parse_fund_data(fund_data, ranked.scheme_code, default_type, ranked)
+                    if parsed_fund:
+                        all_funds.append(parsed_fund)
         
         if all_funds:
-            logger.info(f"Successfully fetched {len(all_funds)} TOP PERFORMING funds (ranked by 3-year CAGR)")
+            logger.info(f"Successfully fetched {len(all_funds)} TOP PERFORMING funds (ranked by {fund_ranker.description})")
             return all_funds, True
         else:
             logger.warning("No curated funds fetched, will use fallback")
@@ -627,8 +1035,8 @@ class MFApiService:
                         'nav': latest_nav,
                         'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
                         'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                        'expected_return': self._estimate_returns(fund_data),
-                        'risk_level': self._estimate_risk(fund_data),
+                        'expected_return': self._estimate_returns(fund_data, scheme_code),
+                        'risk_level': self._estimate_risk(fund_data, scheme_code),
                         'is_dynamic': True,
                         'data_source': 'MFApi'
                     }
@@ -650,8 +1058,8 @@ class MFApiService:
                         'nav': latest_nav,
                         'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
                         'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                        'expected_return': self._estimate_returns(fund_data),
-                        'risk_level': self._estimate_risk(fund_data),
+                        'expected_return': self._estimate_returns(fund_data, scheme_code),
+                        'risk_level': self._estimate_risk(fund_data, scheme_code),
                         'is_dynamic': True,
                         'data_source': 'MFApi'
                     }
@@ -673,8 +1081,8 @@ class MFApiService:
                         'nav': latest_nav,
                         'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
                         'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                        'expected_return': self._estimate_returns(fund_data),
-                        'risk_level': self._estimate_risk(fund_data),
+                        'expected_return': self._estimate_returns(fund_data, scheme_code),
+                        'risk_level': self._estimate_risk(fund_data, scheme_code),
                         'is_dynamic': True,
                         'data_source': 'MFApi'
                     }
@@ -703,6 +1111,13 @@ class MFApiService:
         all_funds = []
         seen_scheme_codes = set()
         
+        # Fetch every requested sector's schemes in one concurrent batch
+        self.fetch_funds_concurrently([
+            scheme_code
+            for sector in sectors
+            for scheme_code in self.SECTOR_FUND_CODES.get(sector, [])
+        ])
+        
         for sector in sectors:
             sector_funds = self.get_sector_funds_dynamic(sector)
             # Deduplicate by scheme_code
@@ -724,40 +1139,19 @@ class MFApiService:
     
     def get_all_index_funds_dynamic(self) -> List[str]:
         """
-        Dynamically discover all index fund scheme codes from MFApi
-        by fetching all funds and filtering for index funds
+        Discover index fund scheme codes from the local scheme master list
+        (names containing index/nifty/sensex, excluding FoF and ELSS schemes)
         
         Returns:
             List of scheme codes for index funds
         """
-        try:
-            response = requests.get(f"{self.BASE_URL}/mf", timeout=10)
-            if response.status_code == 200:
-                all_funds = response.json()
-                index_fund_codes = []
-                
-                # Filter for funds with "Index" or "Nifty" in name (case-insensitive)
-                for fund in all_funds:
-                    scheme_name = fund.get('schemeName', '')
-                    scheme_code = str(fund.get('schemeCode', ''))
-                    
-                    # Check if it's an index fund
-                    if scheme_code and scheme_name and ('index' in scheme_name.lower() or 'nifty' in scheme_name.lower()):
-                        # Exclude FoF (Fund of Funds), ELSS, and other non-pure index funds
-                        if ('fof' not in scheme_name.lower() and
-                            'fund of fund' not in scheme_name.lower() and
-                            'elss' not in scheme_name.lower() and
-                            'tax saver' not in scheme_name.lower()):
-                            index_fund_codes.append(scheme_code)
-                
-                logger.info(f"Discovered {len(index_fund_codes)} index funds dynamically")
-                return index_fund_codes[:50]  # Limit to 50 to avoid overwhelming
-            else:
-                logger.warning(f"Failed to fetch all funds: {response.status_code}")
-                return []
-        except Exception as e:
-            logger.error(f"Error discovering index funds: {e}")
+        index_fund_codes = self.scheme_master.get_codes('index')
+        if not index_fund_codes:
+            logger.warning("Scheme master list unavailable, no index funds discovered")
             return []
+        
+        logger.info(f"Discovered {len(index_fund_codes)} index funds from scheme master list")
+        return index_fund_codes[:50]  # Limit to 50 to avoid overwhelming
     
     def get_index_funds(self, risk_profile: str, max_funds: int = 15, use_ranking: bool = True) -> tuple[List[Dict], bool]:
         """
@@ -766,7 +1160,7 @@ class MFApiService:
         Args:
             risk_profile: 'low_risk', 'medium_risk', or 'high_risk'
             max_funds: Maximum number of funds to return
-            use_ranking: Whether to rank by 3-year CAGR (default: True)
+            use_ranking: Whether to rank by multi-criteria score (default: True)
             
         Returns:
             Tuple of (list of fund dicts, is_api_data boolean)
@@ -779,23 +1173,14 @@ class MFApiService:
         # Use curated codes for Top Picks, dynamic discovery for All Available
         if use_ranking:
             # Top Picks mode - use curated verified codes
-            all_available_codes = (
-                self.INDEX_FUND_CODES.get('large_cap', []) +
-                self.INDEX_FUND_CODES.get('mid_cap', [])
-            )
-            # Remove duplicates
-            all_available_codes = list(dict.fromkeys(all_available_codes))
+            all_available_codes = self.get_curated_index_codes()
             logger.info(f"Using {len(all_available_codes)} curated index fund codes for Top Picks")
         else:
             # All Available mode - dynamically discover all index funds
             all_available_codes = self.get_all_index_funds_dynamic()
             if not all_available_codes:
                 # Fallback to curated if dynamic discovery fails
-                all_available_codes = (
-                    self.INDEX_FUND_CODES.get('large_cap', []) +
-                    self.INDEX_FUND_CODES.get('mid_cap', [])
-                )
-                all_available_codes = list(dict.fromkeys(all_available_codes))
+                all_available_codes = self.get_curated_index_codes()
                 logger.warning("Dynamic discovery failed, using curated codes as fallback")
         
         if not all_available_codes:
@@ -808,19 +1193,17 @@ class MFApiService:
         
         # Fetch and optionally rank funds
         if use_ranking:
-            # Rank by 3-year CAGR
-            ranked_funds = self.rank_funds_by_performance(all_available_codes)
-            for scheme_code, cagr in ranked_funds[:max_funds]:
-                if cagr > -999:
-                    fund_data = self.fetch_fund_details(scheme_code)
-                    if fund_data:
-                        parsed_fund = self._parse_fund_data(fund_data, scheme_code, 'Index Fund', cagr)
-                        if parsed_fund:
-                            all_funds.append(parsed_fund)
+            for ranked in self.rank_funds(all_available_codes, k=max_funds):
+                fund_data = self.fetch_fund_details(ranked.scheme_code)
+                if fund_data:
+                    parsed_fund = self._parse_fund_data(fund_data, ranked.scheme_code, 'Index Fund', ranked)
+                    if parsed_fund:
+                        all_funds.append(parsed_fund)
         else:
             # No ranking - just fetch first N funds
+            batch = self.fetch_funds_concurrently(all_available_codes[:max_funds])
             for scheme_code in all_available_codes[:max_funds]:
-                fund_data = self.fetch_fund_details(scheme_code)
+                fund_data = batch.get(scheme_code)
                 if fund_data:
                     parsed_fund = self._parse_fund_data(fund_data, scheme_code, 'Index Fund')
                     if parsed_fund:
@@ -833,8 +1216,9 @@ class MFApiService:
             logger.warning("No index funds fetched")
             return [], False
     
-    def _parse_fund_data(self, fund_data: Dict, scheme_code: str, default_type: str, cagr: Optional[float] = None) -> Optional[Dict]:
-        """Helper method to parse fund data into standard format"""
+    def _parse_fund_data(self, fund_data: Dict, scheme_code: str, default_type: str,
+                         ranked: Optional[RankedFund] = None) -> Optional[Dict]:
+        """Helper method to parse fund data into standard format (with ranking details if ranked)"""
         try:
             latest_nav = float(fund_data['data'][0]['nav']) if fund_data.get('data') else 0
             fund_info = {
@@ -844,13 +1228,14 @@ class MFApiService:
                 'nav': latest_nav,
                 'nav_date': fund_data['data'][0]['date'] if fund_data.get('data') else None,
                 'fund_house': fund_data.get('meta', {}).get('fund_house', 'Unknown'),
-                'expected_return': self._estimate_returns(fund_data),
-                'risk_level': self._estimate_risk(fund_data),
+                'expected_return': self._estimate_returns(fund_data, scheme_code),
+                'risk_level': self._estimate_risk(fund_data, scheme_code),
                 'is_dynamic': True,
                 'data_source': 'MFApi'
             }
-            if cagr is not None:
-                fund_info['cagr_3y'] = cagr
+            if ranked is not None:
+                fund_info['cagr_3y'] = ranked.metrics.cagr_3y
+                fund_info['ranking_score'] = ranked.score
             return fund_info
         except Exception as e:
             logger.error(f"Error parsing fund data for {scheme_code}: {e}")
@@ -858,63 +1243,143 @@ class MFApiService:
     
     def get_nav_by_fund_name(self, fund_name: str) -> Optional[float]:
         """
-        Get NAV for a fund by searching through all sector funds
-        Returns NAV if found, None otherwise
+        Get the latest NAV for a fund by name
+        
+        The name is resolved to a scheme code through the persistent name map
+        (exact, normalized or fuzzy match against the scheme master list), so
+        this costs one dictionary lookup plus at most one scheme fetch. If the
+        master list is unavailable, cached and curated schemes are matched by
+        name instead (fetched as one concurrent batch).
+        
+        Returns:
+            NAV if found, None otherwise
         """
-        # Search through all cached funds first
-        for cache_key, cached_data in self.cache.items():
-            if cache_key.startswith('fund_'):
-                try:
-                    cached_name = cached_data.get('meta', {}).get('scheme_name', '')
-                    if cached_name and fund_name.lower() in cached_name.lower():
-                        latest_nav = float(cached_data['data'][0]['nav']) if cached_data.get('data') else None
-                        if latest_nav:
-                            logger.info(f"Found NAV {latest_nav} for {fund_name} in cache")
-                            return latest_nav
-                except Exception as e:
-                    logger.debug(f"Error checking cached fund: {e}")
-                    continue
+        scheme_code = self.name_resolver.resolve(fund_name)
+        if scheme_code:
+            fund_data = self.fetch_fund_details(scheme_code)
+            latest_nav = self._latest_nav(fund_data)
+            if latest_nav:
+                logger.info(f"Found NAV {latest_nav} for {fund_name} (scheme {scheme_code})")
+                return latest_nav
+            if fund_data is not None:
+                # Resolved scheme has no NAVs (e.g. wound up), resolve again next time
+                self.name_resolver.forget(fund_name)
+            return None
         
-        # If not in cache, search through general funds first (debt/hybrid)
-        for general_codes in self.GENERAL_FUND_CODES.values():
-            for scheme_code in general_codes:
-                fund_data = self.fetch_fund_details(scheme_code)
-                if fund_data:
-                    try:
-                        scheme_name = fund_data.get('meta', {}).get('scheme_name', '')
-                        if scheme_name and fund_name.lower() in scheme_name.lower():
-                            latest_nav = float(fund_data['data'][0]['nav']) if fund_data.get('data') else None
-                            if latest_nav:
-                                logger.info(f"Found NAV {latest_nav} for {fund_name} via general funds API search")
-                                return latest_nav
-                    except Exception as e:
-                        logger.debug(f"Error parsing general fund data: {e}")
-                        continue
-        
-        # If not found in general funds, search through sector funds
-        for sector_codes in self.SECTOR_FUND_CODES.values():
-            for scheme_code in sector_codes:
-                fund_data = self.fetch_fund_details(scheme_code)
-                if fund_data:
-                    try:
-                        scheme_name = fund_data.get('meta', {}).get('scheme_name', '')
-                        if scheme_name and fund_name.lower() in scheme_name.lower():
-                            latest_nav = float(fund_data['data'][0]['nav']) if fund_data.get('data') else None
-                            if latest_nav:
-                                logger.info(f"Found NAV {latest_nav} for {fund_name} via sector funds API search")
-                                return latest_nav
-                    except Exception as e:
-                        logger.debug(f"Error parsing sector fund data: {e}")
-                        continue
+        if self.scheme_master.get_index() is not None:
+            logger.warning(f"Could not find NAV for fund: {fund_name}")
+            return None
+        
+        # No master list: match against cached payloads, then the curated schemes
+        fund_name_lower = fund_name.lower()
+        candidates = list(self.cache.items())
+        if not any(fund_name_lower in self._scheme_name(data).lower() for _, data in candidates):
+            curated_codes = []
+            for code_groups in (self.GENERAL_FUND_CODES, self.SECTOR_FUND_CODES):
+                for codes in code_groups.values():
+                    curated_codes.extend(codes)
+            candidates = list(self.fetch_funds_concurrently(curated_codes).items())
+        
+        for _, fund_data in candidates:
+            if fund_data and fund_name_lower in self._scheme_name(fund_data).lower():
+                latest_nav = self._latest_nav(fund_data)
+                if latest_nav:
+                    logger.info(f"Found NAV {latest_nav} for {fund_name} by scanning fetched schemes")
+                    return latest_nav
         
         logger.warning(f"Could not find NAV for fund: {fund_name}")
         return None
+    
+    def get_navs_by_fund_names(self, fund_names: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Get the latest NAVs for many fund names at once
+        
+        Names are resolved to scheme codes locally, the resolved schemes are
+        fetched as one concurrent batch, and each name is then answered from cache.
+        
+        Returns:
+            Dict mapping fund name to NAV (None if not found)
+        """
+        unique_names = list(dict.fromkeys(name for name in fund_names if name))
+        scheme_codes = [self.name_resolver.resolve(name) for name in unique_names]
+        self.fetch_funds_concurrently([code for code in scheme_codes if code])
+        return {name: self.get_nav_by_fund_name(name) for name in unique_names}
+    
+    @staticmethod
+    def _scheme_name(fund_data: Dict) -> str:
+        return fund_data.get('meta', {}).get('scheme_name', '') or ''
+    
+    @staticmethod
+    def _latest_nav(fund_data: Optional[Dict]) -> Optional[float]:
+        """Newest NAV in a payload, or None"""
+        try:
+            return float(fund_data['data'][0]['nav']) if fund_data and fund_data.get('data') else None
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+
+def _format_search_result(scheme_code: str, scheme_name: str, fund_data: Optional[Dict]) -> Dict:
+    """Format a matched scheme for the /api/search-fund response"""
+    # NAV, CAGR and risk come from the shared metrics table
+    metrics = mf_api_service.get_metrics(scheme_code, fund_data) if fund_data else None
+    current_nav = metrics.latest_nav if metrics else None
+    # cagr_3y holds a 1-year CAGR for schemes younger than 3 years; don't label that as 3-year
+    cagr_3y = metrics.cagr_3y if metrics and metrics.cagr_years == 3 else None
+    
+    # Determine fund type
+    fund_type = "Other Scheme"
+    if "index" in scheme_name.lower():
+        fund_type = "Index Funds"
+    elif "debt" in scheme_name.lower() or "bond" in scheme_name.lower():
+        fund_type = "Debt Fund"
+    elif "hybrid" in scheme_name.lower() or "balanced" in scheme_name.lower():
+        fund_type = "Hybrid Fund"
+    elif "equity" in scheme_name.lower() or "stock" in scheme_name.lower():
+        fund_type = "Equity Fund"
+    
+    return {
+        'name': scheme_name,
+        'scheme_code': scheme_code,
+        'fund_type': fund_type,
+        'current_nav': current_nav,
+        'cagr_3y': cagr_3y,
+        'risk_level': metrics.risk_tier if metrics else 'Medium',
+        'monthly_sip': 1000,  # Default
+        'expected_return': f"{cagr_3y}%" if cagr_3y is not None else "N/A",
+        'data_source': 'mfapi'
+    }
+
+
+def search_funds_by_name(query: str, limit: int = 15) -> List[Dict]:
+    """
+    Search for mutual funds by name across the full MFApi scheme list
+    Matching runs against the in-memory name index; only the returned top
+    matches have their details fetched. Falls back to scanning the curated
+    scheme codes if the scheme list can't be loaded.
+    """
+    service = mf_api_service
+    index = service.get_scheme_index()
+    if index is None:
+        return _search_curated_funds(query, limit)
+    
+    matched_codes = index.search(query, limit=limit)
+    logger.info(f"Name index matched {len(matched_codes)} of {len(index)} schemes for query: {query}")
+    
+    fund_details = service.fetch_funds_concurrently(matched_codes)
+    results = []
+    for scheme_code in matched_codes:
+        fund_data = fund_details.get(scheme_code)
+        scheme_name = (fund_data or {}).get('meta', {}).get('scheme_name') or index.names[scheme_code]
+        results.append(_format_search_result(scheme_code, scheme_name, fund_data))
+    
+    logger.info(f"Found {len(results)} matching funds for query: {query}")
+    return results
 
 
-def search_funds_by_name(query: str) -> List[Dict]:
+def _search_curated_funds(query: str, limit: int = 15) -> List[Dict]:
     """
-    Search for mutual funds by name across all available scheme codes
-    Returns a list of matching funds with their details
+    Search for mutual funds by name across the curated scheme codes
+    Fetches every curated scheme, so only used when the scheme list is unavailable
     """
     query_lower = query.lower()
     results = []
@@ -928,76 +1393,35 @@ def search_funds_by_name(query: str) -> List[Dict]:
     all_codes.extend(service.GENERAL_FUND_CODES.get('debt', []))
     all_codes.extend(service.GENERAL_FUND_CODES.get('hybrid', []))
     all_codes.extend(service.GENERAL_FUND_CODES.get('equity', []))
-    all_codes.extend(service.INDEX_FUND_CODES)
+    for index_codes in service.INDEX_FUND_CODES.values():
+        all_codes.extend(index_codes)
     
     # Also search sector funds
     for sector_codes in service.SECTOR_FUND_CODES.values():
         all_codes.extend(sector_codes)
     
-    logger.info(f"Searching {len(all_codes)} funds for query: {query}")
+    logger.info(f"Searching {len(all_codes)} curated funds for query: {query}")
+    fund_details = service.fetch_funds_concurrently(all_codes)
     
     # Search through all scheme codes
-    for scheme_code in all_codes:
-        try:
-            fund_data = service.fetch_fund_details(scheme_code)
-            if not fund_data:
+    for scheme_code in dict.fromkeys(all_codes):
+        fund_data = fund_details.get(scheme_code)
+        if not fund_data:
+            continue
+        
+        scheme_name = fund_data.get('meta', {}).get('scheme_name', '')
+        
+        # Check if query matches the fund name
+        if query_lower in scheme_name.lower():
+            # Avoid duplicates
+            if scheme_name in seen_names:
                 continue
+            seen_names.add(scheme_name)
+            results.append(_format_search_result(scheme_code, scheme_name, fund_data))
             
-            scheme_name = fund_data.get('meta', {}).get('scheme_name', '')
-            
-            # Check if query matches the fund name
-            if query_lower in scheme_name.lower():
-                # Avoid duplicates
-                if scheme_name in seen_names:
-                    continue
-                seen_names.add(scheme_name)
-                
-                # Get NAV and calculate CAGR
-                nav_data = fund_data.get('data', [])
-                current_nav = None
-                cagr_3y = None
-                
-                if nav_data and len(nav_data) > 0:
-                    try:
-                        current_nav = float(nav_data[0]['nav'])
-                        
-                        # Calculate 3-year CAGR if enough data
-                        if len(nav_data) >= 756:  # ~3 years of data
-                            nav_3y_ago = float(nav_data[755]['nav'])
-                            cagr_3y = round(((current_nav / nav_3y_ago) ** (1/3) - 1) * 100, 2)
-                    except (ValueError, KeyError, IndexError) as e:
-                        logger.debug(f"Error calculating metrics for {scheme_name}: {e}")
-                
-                # Determine fund type
-                fund_type = "Other Scheme"
-                if "index" in scheme_name.lower():
-                    fund_type = "Index Funds"
-                elif "debt" in scheme_name.lower() or "bond" in scheme_name.lower():
-                    fund_type = "Debt Fund"
-                elif "hybrid" in scheme_name.lower() or "balanced" in scheme_name.lower():
-                    fund_type = "Hybrid Fund"
-                elif "equity" in scheme_name.lower() or "stock" in scheme_name.lower():
-                    fund_type = "Equity Fund"
-                
-                results.append({
-                    'name': scheme_name,
-                    'scheme_code': scheme_code,
-                    'fund_type': fund_type,
-                    'current_nav': current_nav,
-                    'cagr_3y': cagr_3y,
-                    'risk_level': 'Medium',  # Default
-                    'monthly_sip': 1000,  # Default
-                    'expected_return': f"{cagr_3y}%" if cagr_3y else "N/A",
-                    'data_source': 'mfapi'
-                })
-                
-                # Limit results to prevent too many matches
-                if len(results) >= 15:
-                    break
-                    
-        except Exception as e:
-            logger.debug(f"Error searching scheme {scheme_code}: {e}")
-            continue
+            # Limit results to prevent too many matches
+            if len(results) >= limit:
+                break
     
     logger.info(f"Found {len(results)} matching funds for query: {query}")
     return results
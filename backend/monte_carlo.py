@@ -0,0 +1,205 @@
+"""
+Monte Carlo SIP Simulator - Outcome ranges from real NAV histories
+Bootstraps monthly returns from the MFApi NAV histories of the recommended
+schemes (whole months across all schemes at once, keeping their correlation)
+and grows tens of thousands of SIP paths in vectorized chunks, optionally on a
+process pool, within a time budget
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from nav_series import NavSeries
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_MONTH = 365.25 / 12
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+# Paths simulated per vectorized chunk (bounds memory at chunk x months floats)
+CHUNK_PATHS = 2000
+MIN_HISTORY_MONTHS = 24
+MAX_PATHS = int(os.environ.get('MONTE_CARLO_MAX_PATHS', '100000'))
+DEFAULT_TIME_BUDGET = float(os.environ.get('MONTE_CARLO_TIME_BUDGET', '2.0'))  # Seconds
+# Process pool size for large simulations (0 = simulate in the request thread)
+POOL_WORKERS = int(os.environ.get('MONTE_CARLO_WORKERS', '0'))
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+
+
+def aligned_monthly_returns(series_list: Sequence[NavSeries], years_back: Optional[float] = None) -> np.ndarray:
+    """
+    Monthly returns of several schemes over their common history
+    
+    NAVs are sampled on a shared grid of month-length steps ending at the
+    earliest of the schemes' latest NAV dates, so row t holds the same month
+    for every scheme.
+    
+    Args:
+        series_list: NAV series, one per scheme
+        years_back: Only use this many recent years (default: all common history)
+    
+    Returns:
+        Array of shape (months, schemes) with simple monthly returns
+    """
+    if not series_list or any(len(series) < 2 for series in series_list):
+        return np.empty((0, len(series_list)))
+    
+    end_day = min(series.latest_day for series in series_list)
+    start_day = max(int(series.days[0]) for series in series_list)
+    if years_back:
+        start_day = max(start_day, end_day - int(years_back * 365.25))
+    if end_day - start_day < 2 * DAYS_PER_MONTH:
+        return np.empty((0, len(series_list)))
+    
+    steps = int((end_day - start_day) // DAYS_PER_MONTH)
+    grid = end_day - np.round(np.arange(steps, -1, -1) * DAYS_PER_MONTH).astype(np.int64)
+    navs = np.column_stack([series.navs_on_or_before(grid) for series in series_list])
+    return navs[1:] / navs[:-1] - 1
+
+
+def _simulate_chunk(portfolio_returns: np.ndarray, contributions: np.ndarray, paths: int,
+                    seed_sequence: np.random.SeedSequence) -> np.ndarray:
+    """
+    Final values of `paths` SIP paths with monthly returns drawn from portfolio_returns
+    
+    Uses V_m = (1 + R_m) * (V_{m-1} + c_m), evaluated for all paths and months
+    at once as growth_m * cumsum(c_t / growth_{t-1}).
+    """
+    rng = np.random.default_rng(seed_sequence)
+    months = len(contributions)
+    draws = portfolio_returns[rng.integers(0, len(portfolio_returns), size=(paths, months))]
+    growth = np.cumprod(1 + draws, axis=1)
+    growth_before = np.concatenate([np.ones((paths, 1)), growth[:, :-1]], axis=1)
+    return growth[:, -1] * np.sum(contributions / growth_before, axis=1)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool of the given size, created on first use and kept for later requests"""
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def simulate_sip(monthly_returns: np.ndarray, weights: Sequence[float], monthly_investment: float,
+                 investment_years: float, n_paths: int = 10000, seed: Optional[int] = None,
+                 time_budget: Optional[float] = None, workers: Optional[int] = None) -> Dict:
+    """
+    Bootstrap SIP outcomes from historical monthly returns
+    
+    Each simulated month draws one historical month (all schemes together) and
+    applies the weighted portfolio return. Paths run in chunks with seeds
+    spawned from `seed`, so a given seed always produces the same paths; if the
+    time budget runs out, the chunks finished so far are reported.
+    
+    Args:
+        monthly_returns: shape (months, schemes), e.g. from aligned_monthly_returns
+        weights: Portfolio weight per scheme (normalized to sum to 1)
+        monthly_investment: SIP amount invested at the start of every month
+        investment_years: Duration in years
+        n_paths: Number of paths to simulate (capped at MONTE_CARLO_MAX_PATHS)
+        seed: Random seed (None = nondeterministic)
+        time_budget: Seconds to spend simulating (default: MONTE_CARLO_TIME_BUDGET)
+        workers: Process pool size (default: MONTE_CARLO_WORKERS; 0/1 = in-process)
+    
+    Returns:
+        Dict with percentiles of the final value, mean, probability of loss,
+        total invested and how many paths were simulated
+    """
+    monthly_returns = np.asarray(monthly_returns, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if monthly_returns.ndim != 2 or len(monthly_returns) < MIN_HISTORY_MONTHS:
+        raise ValueError(f"At least {MIN_HISTORY_MONTHS} months of common NAV history are required")
+    if monthly_returns.shape[1] != len(weights) or weights.sum() <= 0 or (weights < 0).any():
+        raise ValueError("Weights must be non-negative, one per scheme, and not all zero")
+    
+    n_paths = max(1, min(int(n_paths), MAX_PATHS))
+    time_budget = DEFAULT_TIME_BUDGET if time_budget is None else time_budget
+    workers = POOL_WORKERS if workers is None else workers
+    
+    portfolio_returns = monthly_returns @ (weights / weights.sum())
+    months = int(round(investment_years * 12))
+    if months < 1:
+        raise ValueError("Investment duration must be at least one month")
+    contributions = np.full(months, float(monthly_investment))
+    
+    chunk_sizes = [min(CHUNK_PATHS, n_paths - start) for start in range(0, n_paths, CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    
+    started = time.monotonic()
+    deadline = started + time_budget
+    results = {}
+    if workers and workers > 1 and len(chunk_sizes) > 1:
+        pool = _get_pool(workers)
+        pending = {
+            pool.submit(_simulate_chunk, portfolio_returns, contributions, size, chunk_seed): index
+            for index, (size, chunk_seed) in enumerate(zip(chunk_sizes, seeds))
+        }
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                results[pending.pop(future)] = future.result()
+        for future in pending:
+            future.cancel()
+    else:
+        for index, (size, chunk_seed) in enumerate(zip(chunk_sizes, seeds)):
+            if results and time.monotonic() >= deadline:
+                break
+            results[index] = _simulate_chunk(portfolio_returns, contributions, size, chunk_seed)
+    
+    # Keep chunk order so results for a seed don't depend on completion order
+    final_values = np.concatenate([results[index] for index in sorted(results)])
+    elapsed = time.monotonic() - started
+    total_invested = float(contributions.sum())
+    
+    if len(final_values) < n_paths:
+        logger.warning(f"Monte Carlo time budget hit: {len(final_values)}/{n_paths} paths in {elapsed:.2f}s")
+    
+    return {
+        'percentiles': {
+            f'p{p}': round(float(value), 2)
+            for p, value in zip(PERCENTILES, np.percentile(final_values, PERCENTILES))
+        },
+        'mean_value': round(float(final_values.mean()), 2),
+        'probability_of_loss': round(float((final_values < total_invested).mean()), 4),
+        'total_invested': total_invested,
+        'paths_requested': n_paths,
+        'paths_simulated': int(len(final_values)),
+        'history_months': int(len(monthly_returns)),
+        'seed': seed,
+        'elapsed_seconds': round(elapsed, 3)
+    }
+
+
+def simulate_schemes(scheme_codes: List[str], weights: Sequence[float], monthly_investment: float,
+                     investment_years: float, years_back: Optional[float] = None, **kwargs) -> Dict:
+    """
+    Run simulate_sip on the NAV histories of MFApi schemes
+    
+    Histories come from the MFApi service cache/NAV store (fetched concurrently
+    if missing). Extra keyword arguments are passed to simulate_sip.
+    """
+    from mf_api_service import mf_api_service
+    
+    batch = mf_api_service.get_nav_series_batch(scheme_codes)
+    series_list = []
+    for scheme_code in scheme_codes:
+        series = batch.get(scheme_code)
+        if series is None or len(series) < 2:
+            raise ValueError(f"No NAV history available for scheme {scheme_code}")
+        series_list.append(series)
+    
+    monthly_returns = aligned_monthly_returns(series_list, years_back)
+    result = simulate_sip(monthly_returns, weights, monthly_investment, investment_years, **kwargs)
+    result['scheme_codes'] = list(scheme_codes)
+    return result
+
+# Made with Bob
@@ -0,0 +1,135 @@
+"""
+NAV Series - Columnar NumPy representation of MFApi NAV histories
+Dates are stored as int32 days since the Unix epoch and NAVs as float64,
+both sorted oldest first so point-in-time lookups are a single searchsorted
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365.0
+
+
+def to_epoch_day(value) -> int:
+    """Convert a date/datetime to days since 1970-01-01"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - date(1970, 1, 1)).days
+
+
+def today_epoch_day() -> int:
+    """Today's date as days since 1970-01-01"""
+    return to_epoch_day(date.today())
+
+
+class NavSeries:
+    """Immutable NAV history: parallel arrays of epoch days and NAVs (oldest first)"""
+    
+    __slots__ = ('days', 'navs')
+    
+    def __init__(self, days: np.ndarray, navs: np.ndarray):
+        self.days = days
+        self.navs = navs
+    
+    @classmethod
+    def from_mfapi(cls, entries: List[Dict]) -> 'NavSeries':
+        """
+        Parse an MFApi 'data' list ({'date': 'dd-mm-YYYY', 'nav': '12.34'}, newest first)
+        
+        Dates are rearranged to ISO strings and parsed in one numpy call instead of
+        one strptime per entry. Entries with unparseable or non-positive NAVs are dropped.
+        """
+        if not entries:
+            return cls(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64))
+        
+        iso_dates = []
+        nav_values = []
+        for entry in entries:
+            raw_date = entry.get('date', '')
+            try:
+                nav = float(entry.get('nav', 0))
+            except (TypeError, ValueError):
+                continue
+            if nav <= 0 or len(raw_date) != 10:
+                continue
+            iso_dates.append(f"{raw_date[6:]}-{raw_date[3:5]}-{raw_date[:2]}")
+            nav_values.append(nav)
+        
+        try:
+            days = np.array(iso_dates, dtype='datetime64[D]').astype(np.int32)
+        except ValueError as e:
+            logger.error(f"Error parsing NAV dates: {e}")
+            return cls(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64))
+        navs = np.array(nav_values, dtype=np.float64)
+        
+        # MFApi returns newest first; keep a stable ascending order for searchsorted
+        order = np.argsort(days, kind='stable')
+        return cls(days[order], navs[order])
+    
+    def __len__(self) -> int:
+        return len(self.days)
+    
+    @property
+    def latest_day(self) -> Optional[int]:
+        return int(self.days[-1]) if len(self.days) else None
+    
+    @property
+    def latest_nav(self) -> Optional[float]:
+        return float(self.navs[-1]) if len(self.navs) else None
+    
+    def nav_on_or_before(self, day: int) -> Optional[Tuple[int, float]]:
+        """Most recent (day, nav) at or before the given epoch day"""
+        idx = int(np.searchsorted(self.days, day, side='right')) - 1
+        if idx < 0:
+            return None
+        return int(self.days[idx]), float(self.navs[idx])
+    
+    def navs_on_or_before(self, days: np.ndarray) -> np.ndarray:
+        """
+        Vectorized nav_on_or_before for an array of epoch days
+        
+        Returns:
+            NAV for each day (NaN where the day precedes the history)
+        """
+        idx = np.searchsorted(self.days, days, side='right') - 1
+        navs = self.navs[np.clip(idx, 0, None)] if len(self.navs) else np.full(len(idx), np.nan)
+        return np.where(idx >= 0, navs, np.nan)
+    
+    def period_return(self, days_back: int, today: Optional[int] = None) -> Optional[float]:
+        """Simple percentage return from the NAV on or before today - days_back to the latest NAV"""
+        if len(self) < 2:
+            return None
+        today = today_epoch_day() if today is None else today
+        start = self.nav_on_or_before(today - days_back)
+        if not start:
+            return None
+        return (self.latest_nav / start[1] - 1) * 100
+    
+    def cagr(self, years: float, today: Optional[int] = None, min_coverage: float = 0.9) -> Optional[float]:
+        """
+        CAGR (percentage) from the NAV closest to `years` ago up to the latest NAV
+        
+        Returns None if the history doesn't reach back at least
+        min_coverage * years from today.
+        """
+        if len(self) < 2:
+            return None
+        today = today_epoch_day() if today is None else today
+        start = self.nav_on_or_before(today - int(years * DAYS_PER_YEAR))
+        if not start:
+            return None
+        
+        start_day, start_nav = start
+        actual_days = today - start_day
+        if actual_days < years * DAYS_PER_YEAR * min_coverage:
+            return None
+        
+        actual_years = actual_days / DAYS_PER_YEAR
+        return (pow(self.latest_nav / start_nav, 1 / actual_years) - 1) * 100
+
+# Made with Bob
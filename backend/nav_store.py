@@ -0,0 +1,179 @@
+"""
+NAV History Store - Persistent on-disk cache for MFApi scheme data
+Backed by SQLite so fetched histories survive restarts and are shared by
+every gunicorn worker on the same host
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nav_store.db')
+
+
+class StoredScheme(NamedTuple):
+    """A scheme payload loaded from the store"""
+    payload: Dict
+    fetched_at: datetime
+    full_synced_at: Optional[datetime]
+
+
+class NavHistoryStore:
+    """SQLite store of raw MFApi scheme payloads (and their derived metrics) keyed by scheme code"""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get('NAV_STORE_PATH', DEFAULT_STORE_PATH)
+        self._local = threading.local()
+        self._init_schema()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # WAL lets readers in other workers proceed while one worker writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def _init_schema(self):
+        """Create tables if they don't exist"""
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS nav_history (
+                scheme_code TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                full_synced_at REAL
+            )
+        """)
+        # Stores created before incremental refresh lack the full-sync column
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(nav_history)')}
+        if 'full_synced_at' not in columns:
+            conn.execute('ALTER TABLE nav_history ADD COLUMN full_synced_at REAL')
+        # Metrics row per scheme, tagged with the payload signature it was derived from
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scheme_metrics (
+                scheme_code TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                metrics TEXT NOT NULL
+            )
+        """)
+        conn.commit()
+    
+    def get(self, scheme_code: str) -> Optional[StoredScheme]:
+        """
+        Load a stored scheme payload
+        
+        Returns:
+            StoredScheme(payload, fetched_at, full_synced_at) or None if not stored
+        """
+        try:
+            row = self._connect().execute(
+                'SELECT payload, fetched_at, full_synced_at FROM nav_history WHERE scheme_code = ?',
+                (scheme_code,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"NAV store read failed for {scheme_code}: {e}")
+            return None
+        
+        if not row:
+            return None
+        return StoredScheme(
+            payload=json.loads(row[0]),
+            fetched_at=datetime.fromtimestamp(row[1]),
+            full_synced_at=datetime.fromtimestamp(row[2]) if row[2] else None
+        )
+    
+    def put(self, scheme_code: str, payload: Dict, fetched_at: Optional[datetime] = None,
+            full_synced_at: Optional[datetime] = None):
+        """
+        Store (or replace) a scheme payload
+        
+        full_synced_at is only updated when given, so incremental merges keep the
+        timestamp of the last full download.
+        """
+        timestamp = fetched_at.timestamp() if fetched_at else time.time()
+        synced = full_synced_at.timestamp() if full_synced_at else None
+        try:
+            conn = self._connect()
+            conn.execute(
+                """
+                INSERT INTO nav_history (scheme_code, payload, fetched_at, full_synced_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(scheme_code) DO UPDATE SET
+                    payload = excluded.payload,
+                    fetched_at = excluded.fetched_at,
+                    full_synced_at = COALESCE(excluded.full_synced_at, nav_history.full_synced_at)
+                """,
+                (scheme_code, json.dumps(payload, separators=(',', ':')), timestamp, synced)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"NAV store write failed for {scheme_code}: {e}")
+    
+    def get_metrics(self, scheme_code: str) -> Optional[Tuple[tuple, Dict]]:
+        """
+        Load the stored metrics row of a scheme
+        
+        Returns:
+            (payload signature, metrics dict) or None if not stored
+        """
+        try:
+            row = self._connect().execute(
+                'SELECT signature, metrics FROM scheme_metrics WHERE scheme_code = ?',
+                (scheme_code,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Metrics read failed for {scheme_code}: {e}")
+            return None
+        
+        if not row:
+            return None
+        return tuple(json.loads(row[0])), json.loads(row[1])
+    
+    def put_metrics(self, scheme_code: str, signature: tuple, metrics: Dict):
+        """Store (or replace) the metrics row of a scheme"""
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO scheme_metrics (scheme_code, signature, metrics) VALUES (?, ?, ?)',
+                (scheme_code, json.dumps(list(signature)), json.dumps(metrics, separators=(',', ':')))
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Metrics write failed for {scheme_code}: {e}")
+    
+    def delete(self, scheme_code: str):
+        """Remove a stored scheme payload and its metrics"""
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM nav_history WHERE scheme_code = ?', (scheme_code,))
+            conn.execute('DELETE FROM scheme_metrics WHERE scheme_code = ?', (scheme_code,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"NAV store delete failed for {scheme_code}: {e}")
+
+
+def create_nav_store() -> Optional[NavHistoryStore]:
+    """
+    Create the default store, or None if persistence is disabled/unavailable
+    Set NAV_STORE_PATH to an empty string to disable the on-disk store
+    """
+    if os.environ.get('NAV_STORE_PATH') == '':
+        return None
+    try:
+        return NavHistoryStore()
+    except sqlite3.Error as e:
+        logger.warning(f"NAV store unavailable, using in-memory cache only: {e}")
+        return None
+
+# Made with Bob
@@ -4,12 +4,18 @@ from models import db, User, SIPRecommendation
 from fund_data import FundDataService
 from sector_funds import get_sectors_list, get_sector_funds, SECTOR_FUNDS
 from holdings_service import holdings_service
+from datetime import datetime
 import re
 
 api = Blueprint('api', __name__)
 engine = SIPRecommendationEngine()
 fund_service = FundDataService()
 
+MAX_COMPARE_SCENARIOS = 500
+MAX_MONTE_CARLO_SCHEMES = 20
+MAX_MONTE_CARLO_PATHS = 50000
+MAX_BACKTEST_SCHEMES = 20
+
 # Import limiter from app (temporarily disabled for deployment fix)
 # from app import limiter
 
@@ -42,6 +48,13 @@ def validate_positive_number(value, min_val=0, max_val=None):
     except (ValueError, TypeError):
         return False
 
+def validate_years(value, max_val=30):
+    """Validate a whole number of years (fractions are truncated) between 1 and max_val"""
+    try:
+        return 1 <= int(float(value)) <= max_val
+    except (ValueError, TypeError, OverflowError):
+        return False
+
 def sanitize_string(text, max_length=200):
     """Sanitize string input"""
     if not text or not isinstance(text, str):
@@ -50,6 +63,33 @@ def sanitize_string(text, max_length=200):
     text = re.sub(r'<[^>]+>', '', text)
     return text.strip()[:max_length]
 
+def enrich_recommendations(recommendations):
+    """
+    Add NAV and holdings data to a list of recommendations
+    Missing NAVs are resolved in one batch instead of one lookup per fund
+    """
+    # Add NAV data if not already present (for non-sector funds)
+    missing_nav = [rec for rec in recommendations if 'nav' not in rec or rec.get('nav') is None]
+    if missing_nav:
+        try:
+            navs = fund_service.get_current_navs([rec['fund_name'] for rec in missing_nav])
+        except Exception as e:
+            print(f"Failed to get NAVs for recommendations: {e}")
+            navs = {}
+        for rec in missing_nav:
+            nav = navs.get(rec['fund_name'])
+            if nav and nav != 100.00:  # 100.00 is the default fallback
+                rec['nav'] = nav
+                rec['nav_date'] = 'Latest'
+                rec['data_source'] = 'static_fallback'
+    
+    # Get holdings for all funds
+    for rec, holdings_data in zip(recommendations, holdings_service.get_holdings_batch(recommendations)):
+        if holdings_data:
+            rec['holdings'] = holdings_data
+    
+    return recommendations
+
 @api.route('/generate-recommendations', methods=['POST'])
 # @limiter.limit("10 per minute")
 def generate_recommendations():
@@ -176,24 +216,7 @@ def generate_recommendations():
         db.session.commit()
         
         # Enrich recommendations with NAV and holdings data
-        enriched_recommendations = []
-        for rec in recommendations['recommendations']:
-            # Add NAV data if not already present (for non-sector funds)
-            if 'nav' not in rec or rec.get('nav') is None:
-                try:
-                    nav = fund_service.get_current_nav(rec['fund_name'])
-                    if nav and nav != 100.00:  # 100.00 is the default fallback
-                        rec['nav'] = nav
-                        rec['nav_date'] = 'Latest'
-                        rec['data_source'] = 'static_fallback'
-                except Exception as e:
-                    print(f"Failed to get NAV for {rec['fund_name']}: {e}")
-            
-            # Get holdings for this fund
-            holdings_data = holdings_service.get_holdings(rec)
-            if holdings_data:
-                rec['holdings'] = holdings_data
-            enriched_recommendations.append(rec)
+        enriched_recommendations = enrich_recommendations(recommendations['recommendations'])
         
         response_data = {
             'user_id': user.id,
@@ -265,25 +288,267 @@ def compare_scenarios():
         if not scenarios or len(scenarios) < 2:
             return jsonify({'error': 'Please provide at least 2 scenarios to compare'}), 400
         
+        if len(scenarios) > MAX_COMPARE_SCENARIOS:
+            return jsonify({'error': f'At most {MAX_COMPARE_SCENARIOS} scenarios can be compared at once'}), 400
+        
+        # All scenarios are projected together in one vectorized pass
+        summaries = engine.compare_scenarios([
+            {
+                'risk_profile': f"{scenario['risk_profile'].lower()}_risk",
+                'investment_years': int(scenario['investment_years']),
+                'monthly_investment': float(scenario['monthly_investment'])
+            }
+            for scenario in scenarios
+        ])
+        
         results = []
-        for scenario in scenarios:
-            risk_profile = f"{scenario['risk_profile'].lower()}_risk"
-            rec = engine.generate_recommendations(
-                risk_profile=risk_profile,
-                investment_years=int(scenario['investment_years']),
-                monthly_investment=float(scenario['monthly_investment'])
-            )
+        for scenario, portfolio_summary in zip(scenarios, summaries):
             results.append({
                 'scenario_name': scenario.get('name', f"Scenario {len(results) + 1}"),
                 'input': scenario,
-                'portfolio_summary': rec['portfolio_summary']
+                'portfolio_summary': portfolio_summary
             })
         
         return jsonify({'comparisons': results}), 200
         
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': f'Invalid scenario: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/projection-timeline', methods=['POST'])
+# @limiter.limit("30 per minute")
+def get_projection_timeline():
+    """
+    Get year-by-year (or month-by-month) invested amount and projected value
+    for each category and for the whole portfolio
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'Request body is required'}), 400
+        
+        for field in ['risk_profile', 'investment_years', 'monthly_investment']:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        risk_profile = str(data['risk_profile']).lower()
+        if risk_profile not in ['low', 'medium', 'high']:
+            return jsonify({'error': 'Risk profile must be low, medium, or high'}), 400
+        
+        if not validate_years(data['investment_years'], max_val=30):
+            return jsonify({'error': 'Investment years must be between 1 and 30'}), 400
+        
+        if not validate_positive_number(data['monthly_investment'], min_val=499, max_val=10000000):
+            return jsonify({'error': 'Monthly investment must be between 500 and 10,000,000'}), 400
+        
+        frequency = data.get('frequency', 'yearly')
+        if frequency not in ['yearly', 'monthly']:
+            return jsonify({'error': 'frequency must be yearly or monthly'}), 400
+        
+        risk_profile_key = f"{risk_profile}_risk"
+        investment_years = int(data['investment_years'])
+        monthly_investment = float(data['monthly_investment'])
+        
+        allocation = engine.adjust_allocation_by_duration(risk_profile_key, investment_years)
+        returns = engine.calculate_expected_returns(monthly_investment, investment_years, allocation, timeline=frequency)
+        
+        return jsonify({
+            'timeline': returns['timeline'],
+            'portfolio_summary': returns['portfolio_summary']
+        }), 200
+    
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/sip-planner', methods=['POST'])
+# @limiter.limit("30 per minute")
+def plan_sip():
+    """
+    Project a SIP with yearly step-ups, lump-sum top-ups, pauses and
+    optional per-category return assumptions
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'Request body is required'}), 400
+        
+        for field in ['risk_profile', 'investment_years', 'monthly_investment']:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        risk_profile = str(data['risk_profile']).lower()
+        if risk_profile not in ['low', 'medium', 'high']:
+            return jsonify({'error': 'Risk profile must be low, medium, or high'}), 400
+        
+        if not validate_years(data['investment_years'], max_val=30):
+            return jsonify({'error': 'Investment years must be between 1 and 30'}), 400
+        
+        if not validate_positive_number(data['monthly_investment'], min_val=499, max_val=10000000):
+            return jsonify({'error': 'Monthly investment must be between 500 and 10,000,000'}), 400
+        
+        frequency = data.get('frequency', 'yearly')
+        if frequency not in ['yearly', 'monthly']:
+            return jsonify({'error': 'frequency must be yearly or monthly'}), 400
+        
+        lump_sums = data.get('lump_sums') or []
+        pauses = data.get('pauses') or []
+        if not isinstance(lump_sums, list) or not isinstance(pauses, list):
+            return jsonify({'error': 'lump_sums and pauses must be lists'}), 400
+        if len(lump_sums) > 100 or len(pauses) > 100:
+            return jsonify({'error': 'At most 100 lump sums and 100 pauses are supported'}), 400
+        for item in lump_sums:
+            if not validate_positive_number(item.get('amount'), min_val=0, max_val=100000000):
+                return jsonify({'error': 'Lump sum amounts must be between 0 and 100,000,000'}), 400
+        
+        category_returns = data.get('category_returns') or {}
+        if not isinstance(category_returns, dict):
+            return jsonify({'error': 'category_returns must be an object'}), 400
+        
+        plan = engine.plan_sip(
+            risk_profile=f"{risk_profile}_risk",
+            investment_years=int(data['investment_years']),
+            monthly_investment=float(data['monthly_investment']),
+            step_up_percentage=float(data.get('step_up_percentage', 0)),
+            lump_sums=lump_sums,
+            pauses=pauses,
+            category_returns={category: float(rate) for category, rate in category_returns.items()},
+            frequency=frequency
+        )
+        
+        return jsonify(plan), 200
+    
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return jsonify({'error': f'Invalid plan: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/monte-carlo', methods=['POST'])
+# @limiter.limit("10 per minute")
+def simulate_monte_carlo():
+    """
+    Simulate SIP outcomes by bootstrapping monthly returns from the NAV
+    histories of the given schemes
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'Request body is required'}), 400
+        
+        for field in ['scheme_codes', 'investment_years', 'monthly_investment']:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        scheme_codes = data['scheme_codes']
+        if not isinstance(scheme_codes, list) or not scheme_codes:
+            return jsonify({'error': 'scheme_codes must be a non-empty list'}), 400
+        if len(scheme_codes) > MAX_MONTE_CARLO_SCHEMES:
+            return jsonify({'error': f'At most {MAX_MONTE_CARLO_SCHEMES} schemes can be simulated together'}), 400
+        scheme_codes = [str(code) for code in scheme_codes]
+        
+        # Allocation (%) per scheme; equal weights by default
+        allocations = data.get('allocations') or [1] * len(scheme_codes)
+        if not isinstance(allocations, list) or len(allocations) != len(scheme_codes):
+            return jsonify({'error': 'allocations must have one entry per scheme code'}), 400
+        
+        if not validate_years(data['investment_years'], max_val=30):
+            return jsonify({'error': 'Investment years must be between 1 and 30'}), 400
+        
+        if not validate_positive_number(data['monthly_investment'], min_val=499, max_val=10000000):
+            return jsonify({'error': 'Monthly investment must be between 500 and 10,000,000'}), 400
+        
+        n_paths = data.get('n_paths', 10000)
+        if not validate_positive_number(n_paths, min_val=0, max_val=MAX_MONTE_CARLO_PATHS):
+            return jsonify({'error': f'n_paths must be between 1 and {MAX_MONTE_CARLO_PATHS}'}), 400
+        
+        time_budget = data.get('time_budget_seconds', 2)
+        if not validate_positive_number(time_budget, min_val=0, max_val=10):
+            return jsonify({'error': 'time_budget_seconds must be between 0 and 10'}), 400
+        
+        from monte_carlo import simulate_schemes
+        
+        result = simulate_schemes(
+            scheme_codes,
+            [float(weight) for weight in allocations],
+            monthly_investment=float(data['monthly_investment']),
+            investment_years=int(data['investment_years']),
+            years_back=float(data['history_years']) if data.get('history_years') else None,
+            n_paths=int(n_paths),
+            seed=int(data.get('seed', 42)),
+            time_budget=float(time_budget)
+        )
+        
+        return jsonify(result), 200
+    
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid simulation: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/backtest', methods=['POST'])
+# @limiter.limit("30 per minute")
+def backtest_sip():
+    """
+    Backtest a monthly SIP in the given schemes against their historical NAVs
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({'error': 'Request body is required'}), 400
+        
+        for field in ['scheme_codes', 'monthly_investment', 'start_date']:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        scheme_codes = data['scheme_codes']
+        if not isinstance(scheme_codes, list) or not scheme_codes:
+            return jsonify({'error': 'scheme_codes must be a non-empty list'}), 400
+        if len(scheme_codes) > MAX_BACKTEST_SCHEMES:
+            return jsonify({'error': f'At most {MAX_BACKTEST_SCHEMES} schemes can be backtested together'}), 400
+        scheme_codes = [str(code) for code in scheme_codes]
+        if len(set(scheme_codes)) != len(scheme_codes):
+            return jsonify({'error': 'scheme_codes must not contain duplicates'}), 400
+        
+        # Allocation (%) per scheme; equal weights by default
+        allocations = data.get('allocations') or [1] * len(scheme_codes)
+        if not isinstance(allocations, list) or len(allocations) != len(scheme_codes):
+            return jsonify({'error': 'allocations must have one entry per scheme code'}), 400
+        
+        if not validate_positive_number(data['monthly_investment'], min_val=99, max_val=10000000):
+            return jsonify({'error': 'Monthly investment must be between 100 and 10,000,000'}), 400
+        
+        try:
+            start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+        if end_date and end_date <= start_date:
+            return jsonify({'error': 'end_date must be after start_date'}), 400
+        
+        sip_day = data.get('sip_day')
+        if sip_day is not None and (isinstance(sip_day, bool) or not isinstance(sip_day, int) or not 1 <= sip_day <= 31):
+            return jsonify({'error': 'sip_day must be a whole number between 1 and 31'}), 400
+        
+        from backtest import backtest_schemes
+        
+        result = backtest_schemes(
+            scheme_codes,
+            [float(weight) for weight in allocations],
+            float(data['monthly_investment']),
+            start_date,
+            end_date,
+            sip_day
+        )
+        
+        return jsonify(result), 200
+    
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid backtest: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @api.route('/fund-performance/<fund_name>', methods=['GET'])
 # @limiter.limit("30 per minute")
@@ -362,7 +627,7 @@ def search_fund():
         # Search for funds using MFAPI
         from mf_api_service import search_funds_by_name
         
-        search_results = search_funds_by_name(query)
+        search_results = search_funds_by_name(query, limit=10)
         
         if not search_results:
             return jsonify({
@@ -470,3 +735,14 @@ def get_sector_specific_funds():
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@api.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """
+    Get MFApi cache size and hit/miss/eviction stats for this worker
+    """
+    try:
+        from mf_api_service import mf_api_service
+        return jsonify(mf_api_service.get_cache_stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,218 @@
+"""
+Scheme Master Service - Local copy of the MFApi scheme master list (/mf)
+The multi-megabyte list is downloaded at most once per TTL, persisted to disk
+so restarted/sibling workers reuse it, and pre-classified into categories
+(index / fof / elss / debt / hybrid / equity / other) for local lookups
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from http_client import HttpClient
+from scheme_search import SchemeNameIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MASTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scheme_master.json')
+
+# Checked in order; the first matching category wins (hybrid before debt, so
+# 'Equity & Debt' / 'Equity & Income' hybrids aren't classified as debt)
+CATEGORY_KEYWORDS = [
+    ('fof', ['fof', 'fund of fund']),
+    ('elss', ['elss', 'tax saver', 'tax saving']),
+    ('index', ['index', 'nifty', 'sensex']),
+    ('hybrid', ['hybrid', 'balanced', 'arbitrage', 'multi asset', 'equity savings',
+                'asset allocation', 'dynamic asset', 'equity & debt', 'equity and debt',
+                'equity & income', 'equity and income']),
+    ('debt', ['debt', 'bond', 'gilt', 'liquid', 'money market', 'overnight', 'income',
+              'credit risk', 'treasury', 'duration', 'floater', 'fixed term', 'fmp']),
+    ('equity', ['equity', 'large cap', 'mid cap', 'small cap', 'multi cap', 'flexi cap',
+                'largecap', 'midcap', 'smallcap', 'multicap', 'bluechip', 'flexi', 'focused',
+                'value', 'contra', 'dividend yield', 'opportunities', 'technology', 'pharma',
+                'banking', 'infrastructure', 'consumption', 'thematic', 'sectoral']),
+]
+
+
+def classify_scheme(scheme_name: str) -> str:
+    """Classify a scheme by name into index/fof/elss/debt/hybrid/equity/other"""
+    name = scheme_name.lower().replace('-', ' ')
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in name for keyword in keywords):
+            return category
+    return 'other'
+
+
+class SchemeMasterService:
+    """Scheme master list with a TTL, on-disk persistence and category lookups"""
+    
+    CACHE_DURATION = timedelta(hours=24)
+    RETRY_INTERVAL = timedelta(minutes=5)  # Wait between failed downloads
+    
+    def __init__(self, base_url: str, http_client: Optional[HttpClient] = None, path: Optional[str] = None):
+        self.base_url = base_url
+        self.http = http_client or HttpClient()
+        self.path = path or os.environ.get('SCHEME_MASTER_PATH', DEFAULT_MASTER_PATH)
+        self.fetched_at = None
+        self.last_download_ok = None
+        self.last_download_attempt = None
+        self._names: Dict[str, str] = {}
+        self._categories: Dict[str, str] = {}
+        self._codes_by_category: Dict[str, List[str]] = {}
+        self._index = None
+        self._lock = threading.Lock()
+        # Downloads run outside _lock; one at a time, at most one in the background
+        self._download_lock = threading.Lock()
+        self._refreshing = False
+    
+    def _is_fresh(self) -> bool:
+        return bool(self.fetched_at) and datetime.now() - self.fetched_at < self.CACHE_DURATION
+    
+    def _load_schemes(self, schemes: List[Dict], fetched_at: datetime):
+        """Replace the in-memory list and rebuild the category lookups"""
+        names = {}
+        categories = {}
+        codes_by_category = {}
+        for scheme in schemes:
+            scheme_code = str(scheme.get('schemeCode', ''))
+            scheme_name = scheme.get('schemeName', '')
+            if not scheme_code or not scheme_name:
+                continue
+            category = classify_scheme(scheme_name)
+            names[scheme_code] = scheme_name
+            categories[scheme_code] = category
+            codes_by_category.setdefault(category, []).append(scheme_code)
+        
+        self._names = names
+        self._categories = categories
+        self._codes_by_category = codes_by_category
+        self._index = None
+        self.fetched_at = fetched_at
+        logger.info(f"Loaded scheme master list: {len(names)} schemes " +
+                    ", ".join(f"{category}={len(codes)}" for category, codes in sorted(codes_by_category.items())))
+    
+    def _read_from_disk(self) -> Optional[Dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read scheme master file {self.path}: {e}")
+            return None
+    
+    def _write_to_disk(self, schemes: List[Dict], fetched_at: datetime):
+        """Write atomically so other workers never see a partial file"""
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.scheme_master_')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'fetched_at': fetched_at.timestamp(), 'schemes': schemes}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write scheme master file {self.path}: {e}")
+    
+    def _download(self) -> Optional[List[Dict]]:
+        self.last_download_attempt = datetime.now()
+        try:
+            response = self.http.get(f"{self.base_url}/mf", timeout=15)
+            self.last_download_ok = response.status_code == 200
+            if response.status_code == 200:
+                return response.json()
+            logger.warning(f"Failed to fetch scheme master list: {response.status_code}")
+        except Exception as e:
+            self.last_download_ok = False
+            logger.error(f"Error fetching scheme master list: {e}")
+        return None
+    
+    def _in_retry_backoff(self) -> bool:
+        """True while waiting out RETRY_INTERVAL after a failed download"""
+        return bool(self.last_download_ok is False and self.last_download_attempt and
+                    datetime.now() - self.last_download_attempt < self.RETRY_INTERVAL)
+    
+    def _refresh(self):
+        """Download the list and swap it in (the service lock is only held for the swap)"""
+        try:
+            schemes = self._download()
+            if schemes:
+                fetched_at = datetime.now()
+                with self._lock:
+                    self._load_schemes(schemes, fetched_at)
+                self._write_to_disk(schemes, fetched_at)
+        finally:
+            self._refreshing = False
+    
+    def ensure_loaded(self) -> bool:
+        """
+        Make sure a scheme list is loaded, refreshing it once the TTL expires
+        Order: memory -> disk file (if fresh) -> network. A stale copy is served
+        while a single background thread downloads the new list; only a cold
+        start (no copy at all) waits for the download.
+        
+        Returns:
+            True if any scheme list (fresh or stale) is available
+        """
+        if self._is_fresh():
+            return True
+        
+        with self._lock:
+            if self._is_fresh():
+                return True
+            
+            stored = self._read_from_disk()
+            if stored:
+                stored_at = datetime.fromtimestamp(stored.get('fetched_at', 0))
+                if datetime.now() - stored_at < self.CACHE_DURATION or not self._names:
+                    self._load_schemes(stored.get('schemes', []), stored_at)
+                    if self._is_fresh():
+                        return True
+            
+            # Don't hammer the API while it is failing
+            if self._in_retry_backoff():
+                return bool(self._names)
+            
+            if self._names:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, name='scheme-master-refresh', daemon=True).start()
+                return True
+        
+        # Cold start: nothing to serve, so wait for one download (outside the service lock)
+        with self._download_lock:
+            if not self._names and not self._in_retry_backoff():
+                self._refreshing = True
+                self._refresh()
+        return bool(self._names)
+    
+    def get_name(self, scheme_code: str) -> Optional[str]:
+        """Scheme name for a code, or None if unknown"""
+        self.ensure_loaded()
+        return self._names.get(str(scheme_code))
+    
+    def get_category(self, scheme_code: str) -> Optional[str]:
+        """Category (index/fof/elss/debt/hybrid/equity/other) for a code"""
+        self.ensure_loaded()
+        return self._categories.get(str(scheme_code))
+    
+    def get_codes(self, category: str) -> List[str]:
+        """All scheme codes in a category, in master list order"""
+        self.ensure_loaded()
+        return list(self._codes_by_category.get(category, []))
+    
+    def get_index(self) -> Optional[SchemeNameIndex]:
+        """Name search index over the scheme list (built once per list)"""
+        if not self.ensure_loaded():
+            return None
+        with self._lock:
+            if self._index is None:
+                self._index = SchemeNameIndex(self._names.items())
+            return self._index
+    
+    def __len__(self) -> int:
+        return len(self._names)
+
+# Made with Bob
@@ -0,0 +1,141 @@
+"""
+Scheme Search - In-memory name index over the MFApi scheme master list
+Resolves name queries against all listed schemes without fetching any
+scheme details: token postings for whole words, a sorted vocabulary for
+prefix matches and token trigrams to tolerate typos
+"""
+
+import re
+import heapq
+import bisect
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a scheme name and collapse punctuation to single spaces"""
+    return ' '.join(TOKEN_PATTERN.findall(name.lower()))
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SchemeNameIndex:
+    """Token/prefix/trigram index of scheme names keyed by scheme code"""
+    
+    # Minimum trigram similarity for a vocabulary token to count as a typo match
+    FUZZY_THRESHOLD = 0.45
+    
+    def __init__(self, schemes: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            schemes: Iterable of (scheme_code, scheme_name) pairs
+        """
+        self.names: Dict[str, str] = {}
+        self._normalized: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # Normalized name -> first scheme code with that name, for exact lookups
+        self._by_normalized: Dict[str, str] = {}
+        
+        for scheme_code, scheme_name in schemes:
+            if not scheme_code or not scheme_name:
+                continue
+            normalized = normalize_name(scheme_name)
+            self.names[scheme_code] = scheme_name
+            self._normalized[scheme_code] = normalized
+            self._by_normalized.setdefault(normalized, scheme_code)
+            for token in set(normalized.split()):
+                self._postings.setdefault(token, set()).add(scheme_code)
+        
+        # Sorted vocabulary for prefix lookups, trigrams for fuzzy token matching
+        self._vocabulary: List[str] = sorted(self._postings)
+        self._trigram_index: Dict[str, Set[str]] = {}
+        for token in self._vocabulary:
+            for gram in _trigrams(token):
+                self._trigram_index.setdefault(gram, set()).add(token)
+        
+        logger.info(f"Built scheme name index: {len(self.names)} schemes, {len(self._vocabulary)} tokens")
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def find_exact(self, name: str) -> Optional[str]:
+        """Scheme code whose name equals name after normalization, or None"""
+        return self._by_normalized.get(normalize_name(name))
+    
+    def _prefix_postings(self, token: str) -> List[Set[str]]:
+        """Posting sets of every vocabulary word that starts with token"""
+        postings = []
+        start = bisect.bisect_left(self._vocabulary, token)
+        for word in self._vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            postings.append(self._postings[word])
+        return postings
+    
+    def _fuzzy_postings(self, token: str) -> List[Set[str]]:
+        """Posting sets of vocabulary words similar to token (trigram Jaccard similarity)"""
+        grams = _trigrams(token)
+        overlap: Dict[str, int] = {}
+        for gram in grams:
+            for word in self._trigram_index.get(gram, ()):
+                overlap[word] = overlap.get(word, 0) + 1
+        
+        postings = []
+        for word, shared in overlap.items():
+            similarity = shared / (len(grams) + len(_trigrams(word)) - shared)
+            if similarity >= self.FUZZY_THRESHOLD:
+                postings.append(self._postings[word])
+        return postings
+    
+    def search(self, query: str, limit: int = 15) -> List[str]:
+        """
+        Find scheme codes whose names match every word of the query
+        
+        Each query word matches whole words or word prefixes, falling back to
+        similar-looking words when it has no prefix match. Names containing the
+        query as a phrase rank first, then shorter names.
+        
+        Returns:
+            Up to `limit` scheme codes, best matches first
+        """
+        normalized_query = normalize_name(query)
+        tokens = normalized_query.split()
+        if not tokens:
+            return []
+        
+        token_postings = []
+        for token in set(tokens):
+            postings = self._prefix_postings(token) or self._fuzzy_postings(token)
+            if not postings:
+                return []
+            token_postings.append(postings)
+        
+        # Start from the most selective word, then filter instead of building large unions
+        token_postings.sort(key=lambda postings: sum(len(p) for p in postings))
+        candidates = set().union(*token_postings[0])
+        for postings in token_postings[1:]:
+            if len(postings) == 1:
+                candidates &= postings[0]
+            elif len(candidates) < 1000:
+                candidates = {code for code in candidates if any(code in p for p in postings)}
+            else:
+                candidates &= set().union(*postings)
+            if not candidates:
+                return []
+        
+        def rank(scheme_code: str):
+            normalized = self._normalized[scheme_code]
+            return (normalized_query not in normalized, len(normalized), scheme_code)
+        
+        if len(candidates) > limit:
+            return heapq.nsmallest(limit, candidates, key=rank)
+        return sorted(candidates, key=rank)
+
+# Made with Bob
@@ -1,8 +1,6 @@
 # Version: 2.0.0 - Fund count info feature added
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import yfinance as yf
+# Heavy numeric/market-data libraries (numpy, pandas, yfinance) are imported
+# inside the code paths that need them; check_import_time.py guards startup cost
 
 class SIPRecommendationEngine:
     """
@@ -111,7 +109,11 @@ class SIPRecommendationEngine:
         Adjust asset allocation based on investment duration
         Longer duration allows for more equity exposure
         """
-        base_allocation = self.fund_categories[risk_profile].copy()
+        # Copy each category too, so adjustments don't leak into fund_categories
+        base_allocation = {
+            category: dict(details)
+            for category, details in self.fund_categories[risk_profile].items()
+        }
         
         if investment_years >= 10:
             # Long term - can take more risk
@@ -136,24 +138,28 @@ class SIPRecommendationEngine:
         
         return base_allocation
     
-    def calculate_expected_returns(self, monthly_investment, investment_years, allocation):
+    def calculate_expected_returns(self, monthly_investment, investment_years, allocation, timeline=None):
         """
         Calculate expected returns based on SIP investment
+        
+        timeline: None, 'yearly' or 'monthly' - also return invested/value series
+        per category and for the whole portfolio at that frequency
         """
+        from sip_projection import contributions_xirr, sip_future_values
+        
         total_months = investment_years * 12
         results = {}
         
-        for category, details in allocation.items():
-            annual_return = details['expected_return'] / 100
-            monthly_return = annual_return / 12
-            
-            # SIP Future Value calculation
-            future_value = monthly_investment * (
-                ((1 + monthly_return) ** total_months - 1) / monthly_return
-            ) * (1 + monthly_return)
-            
+        # SIP Future Value calculation for all categories in one pass
+        future_values = sip_future_values(
+            monthly_investment,
+            investment_years,
+            [details['expected_return'] for details in allocation.values()]
+        )
+        
+        for (category, details), future_value in zip(allocation.items(), future_values):
             allocation_amount = monthly_investment * (details['allocation'] / 100)
-            category_future_value = future_value * (details['allocation'] / 100)
+            category_future_value = float(future_value) * (details['allocation'] / 100)
             
             results[category] = {
                 'monthly_investment': allocation_amount,
@@ -169,17 +175,194 @@ class SIPRecommendationEngine:
         total_expected_value = sum(r['expected_value'] for r in results.values())
         total_gains = total_expected_value - total_invested
         
-        return {
+        expected_returns = {
             'category_wise': results,
             'portfolio_summary': {
                 'total_monthly_investment': monthly_investment,
                 'total_invested': total_invested,
                 'expected_portfolio_value': total_expected_value,
                 'expected_gains': total_gains,
-                'overall_return_percentage': (total_gains / total_invested) * 100
+                'overall_return_percentage': (total_gains / total_invested) * 100,
+                'expected_xirr': contributions_xirr([[monthly_investment] * total_months], [total_expected_value])[0]
+            }
+        }
+        
+        if timeline:
+            expected_returns['timeline'] = self._build_timeline(monthly_investment, investment_years, allocation, timeline)
+        
+        return expected_returns
+    
+    def _build_timeline(self, monthly_investment, investment_years, allocation, frequency):
+        """
+        Invested/value series per category and for the portfolio (see sip_projection.sip_timeline)
+        """
+        from sip_projection import sip_timeline
+        
+        categories = list(allocation.keys())
+        series = sip_timeline(
+            monthly_investment,
+            investment_years,
+            [allocation[category]['expected_return'] for category in categories],
+            [allocation[category]['allocation'] for category in categories],
+            frequency=frequency
+        )
+        
+        return {
+            'frequency': frequency,
+            'periods': [round(float(period), 4) for period in series['periods']],
+            'category_wise': {
+                category: {
+                    'invested': series['invested'][i].round(2).tolist(),
+                    'value': series['value'][i].round(2).tolist()
+                }
+                for i, category in enumerate(categories)
+            },
+            'portfolio': {
+                'invested': series['invested'].sum(axis=0).round(2).tolist(),
+                'value': series['value'].sum(axis=0).round(2).tolist()
             }
         }
     
+    def plan_sip(self, risk_profile, investment_years, monthly_investment, step_up_percentage=0,
+                 lump_sums=None, pauses=None, category_returns=None, frequency='yearly'):
+        """
+        Project a planned SIP with yearly step-ups, lump-sum top-ups and pauses
+        
+        risk_profile: 'low_risk', 'medium_risk', or 'high_risk' (sets the allocation)
+        step_up_percentage: yearly increase of the SIP amount (e.g. 10 for +10% a year)
+        lump_sums: list of {'month': int, 'amount': float} one-off investments (month 1 = first month)
+        pauses: list of {'start_month': int, 'end_month': int} ranges without SIP instalments
+        category_returns: optional {category: expected annual return %} overriding the defaults
+        frequency: 'yearly' or 'monthly' timeline
+        """
+        from sip_projection import build_contributions, contributions_xirr, project_cash_flows
+        
+        if risk_profile not in ['low_risk', 'medium_risk', 'high_risk']:
+            raise ValueError("Risk profile must be 'low_risk', 'medium_risk', or 'high_risk'")
+        if investment_years < 1 or investment_years > 30:
+            raise ValueError("Investment years must be between 1 and 30")
+        if monthly_investment < 500:
+            raise ValueError("Minimum monthly investment should be ₹500")
+        if step_up_percentage < 0 or step_up_percentage > 100:
+            raise ValueError("Step-up percentage must be between 0 and 100")
+        
+        allocation = self.adjust_allocation_by_duration(risk_profile, investment_years)
+        for category, expected_return in (category_returns or {}).items():
+            if category not in allocation:
+                raise ValueError(f"Unknown category: {category}")
+            if expected_return < -50 or expected_return > 50:
+                raise ValueError("Category returns must be between -50 and 50 percent")
+            allocation[category]['expected_return'] = expected_return
+        
+        sip, lump = build_contributions(
+            monthly_investment,
+            investment_years,
+            step_up_percentage=step_up_percentage,
+            lump_sums=[(int(item['month']), float(item['amount'])) for item in lump_sums or []],
+            pauses=[(int(item['start_month']), int(item['end_month'])) for item in pauses or []]
+        )
+        
+        categories = list(allocation.keys())
+        projection = project_cash_flows(
+            sip + lump,
+            [allocation[category]['expected_return'] for category in categories],
+            [allocation[category]['allocation'] for category in categories],
+            frequency=frequency
+        )
+        
+        category_wise = {}
+        for i, category in enumerate(categories):
+            category_wise[category] = {
+                'total_invested': float(projection['final_invested'][i]),
+                'expected_value': float(projection['final_value'][i]),
+                'expected_return_percentage': allocation[category]['expected_return'],
+                'allocation_percentage': allocation[category]['allocation'],
+                'timeline': {
+                    'invested': projection['invested'][i].round(2).tolist(),
+                    'value': projection['value'][i].round(2).tolist()
+                }
+            }
+        
+        total_invested = float(projection['final_invested'].sum())
+        total_expected_value = float(projection['final_value'].sum())
+        total_gains = total_expected_value - total_invested
+        
+        return {
+            'category_wise': category_wise,
+            'portfolio_summary': {
+                'starting_monthly_investment': monthly_investment,
+                'final_monthly_investment': monthly_investment * (1 + step_up_percentage / 100) ** ((len(sip) - 1) // 12),
+                'total_sip_invested': float(sip.sum()),
+                'total_lump_sum_invested': float(lump.sum()),
+                'total_invested': total_invested,
+                'expected_portfolio_value': total_expected_value,
+                'expected_gains': total_gains,
+                'overall_return_percentage': (total_gains / total_invested) * 100 if total_invested else 0.0,
+                'expected_xirr': contributions_xirr([sip + lump], [total_expected_value])[0]
+            },
+            'timeline': {
+                'frequency': frequency,
+                'periods': [round(float(period), 4) for period in projection['periods']],
+                'invested': projection['invested'].sum(axis=0).round(2).tolist(),
+                'value': projection['value'].sum(axis=0).round(2).tolist()
+            }
+        }
+    
+    def compare_scenarios(self, scenarios):
+        """
+        Project the portfolio summary of many scenarios in one vectorized pass
+        
+        Each scenario is a dict with risk_profile ('low_risk', 'medium_risk' or
+        'high_risk'), investment_years and monthly_investment. Uses the same
+        allocations and formula as generate_recommendations' portfolio_summary.
+        
+        Returns:
+            List of portfolio_summary dicts, in scenario order
+        """
+        from sip_projection import contributions_xirr, project_portfolios
+        
+        categories = ['debt_funds', 'hybrid_funds', 'equity_funds']
+        monthly_amounts, years, rates, allocations = [], [], [], []
+        
+        for scenario in scenarios:
+            risk_profile = scenario['risk_profile']
+            investment_years = scenario['investment_years']
+            monthly_investment = scenario['monthly_investment']
+            
+            if risk_profile not in ['low_risk', 'medium_risk', 'high_risk']:
+                raise ValueError("Risk profile must be 'low_risk', 'medium_risk', or 'high_risk'")
+            if investment_years < 1 or investment_years > 30:
+                raise ValueError("Investment years must be between 1 and 30")
+            if monthly_investment < 500:
+                raise ValueError("Minimum monthly investment should be ₹500")
+            
+            allocation = self.adjust_allocation_by_duration(risk_profile, investment_years)
+            monthly_amounts.append(monthly_investment)
+            years.append(investment_years)
+            rates.append([allocation[category]['expected_return'] for category in categories])
+            allocations.append([allocation[category]['allocation'] for category in categories])
+        
+        if not scenarios:
+            return []
+        
+        projection = project_portfolios(monthly_amounts, years, rates, allocations)
+        xirrs = contributions_xirr(
+            [[amount] * int(round(duration * 12)) for amount, duration in zip(monthly_amounts, years)],
+            projection['expected_portfolio_value']
+        )
+        
+        return [
+            {
+                'total_monthly_investment': monthly_amounts[i],
+                'total_invested': float(projection['total_invested'][i]),
+                'expected_portfolio_value': float(projection['expected_portfolio_value'][i]),
+                'expected_gains': float(projection['expected_gains'][i]),
+                'overall_return_percentage': float(projection['overall_return_percentage'][i]),
+                'expected_xirr': xirrs[i]
+            }
+            for i in range(len(scenarios))
+        ]
+    
     def generate_recommendations(self, risk_profile, investment_years, monthly_investment, max_funds=None, sector_preferences=None, fund_selection_mode='curated', index_funds_only=False):
         """
         Generate complete SIP recommendations
@@ -221,8 +404,24 @@ class SIPRecommendationEngine:
             # Limit to max 5 funds per sector to avoid overwhelming user
             max_funds_per_request = 10
             if len(sector_funds) > max_funds_per_request:
-                # Sort by expected return and take top funds
-                sector_funds = sorted(sector_funds, key=lambda x: x.get('expected_return', 0), reverse=True)[:max_funds_per_request]
+                if data_source_info.get('source') == 'api':
+                    from mf_api_service import mf_api_service
+                    
+                    # Per-sector scores are normalized within each sector, so re-score all
+                    # selected sectors' funds together before cutting across sectors
+                    scheme_codes = list(dict.fromkeys(fund['scheme_code'] for fund in sector_funds if fund.get('scheme_code')))
+                    ranked = {fund.scheme_code: fund.score for fund in mf_api_service.rank_funds(scheme_codes, k=max_funds_per_request)}
+                    for fund in sector_funds:
+                        if fund.get('scheme_code') in ranked:
+                            fund['ranking_score'] = ranked[fund['scheme_code']]
+                        else:
+                            fund.pop('ranking_score', None)
+                    rank_field = 'ranking_score'
+                else:
+                    # Static funds only carry an expected return
+                    rank_field = 'expected_return'
+                from fund_ranking import top_k
+                sector_funds = top_k(sector_funds, max_funds_per_request, key=lambda x: x.get(rank_field))
             
             # Distribute allocation across sector funds
             if sector_funds:
@@ -251,6 +450,7 @@ class SIPRecommendationEngine:
             if max_funds:
                 try:
                     from mf_api_service import mf_api_service
+                    from fund_ranking import fund_ranker
                     
                     # Fetch index funds with ranking based on mode
                     use_ranking = (fund_selection_mode == 'curated')
@@ -285,7 +485,7 @@ class SIPRecommendationEngine:
                             'fund_count': len(api_funds),
                             'has_live_nav': True,
                             'mode': fund_selection_mode,
-                            'ranking': '3-year CAGR' if use_ranking else 'None',
+                            'ranking': fund_ranker.description if use_ranking else 'None',
                             'fund_type': 'Index Funds Only'
                         }
                     else:
@@ -313,10 +513,11 @@ class SIPRecommendationEngine:
             if max_funds:
                 try:
                     from mf_api_service import mf_api_service
+                    from fund_ranking import fund_ranker
                     
                     # Choose method based on mode
                     if fund_selection_mode == 'curated':
-                        # Use intelligent 3-year CAGR ranking
+                        # Use multi-criteria ranking (3-year CAGR, consistency, drawdown, volatility)
                         api_funds, is_api_data = mf_api_service.get_general_funds_curated(risk_profile, max_funds)
                     else:
                         # Use comprehensive (all available funds)
@@ -350,7 +551,7 @@ class SIPRecommendationEngine:
                             'fund_count': len(api_funds),
                             'has_live_nav': True,
                             'mode': fund_selection_mode,
-                            'ranking': '3-year CAGR' if fund_selection_mode == 'curated' else 'None'
+                            'ranking': fund_ranker.description if fund_selection_mode == 'curated' else 'None'
                         }
                     else:
                         # API failed, use fallback
@@ -0,0 +1,232 @@
+"""
+SIP Projection - Vectorized future-value calculations for SIP scenarios
+Evaluates any number of (monthly amount, years, category rates, allocation)
+scenarios in one NumPy pass using the same annuity-due formula as
+SIPRecommendationEngine.calculate_expected_returns
+"""
+
+import numpy as np
+
+from nav_series import DAYS_PER_YEAR
+from xirr import xirr_many
+
+
+def sip_future_values(monthly_amounts, years, annual_rates):
+    """
+    Future value of a monthly SIP paid at the start of each month
+    
+    FV = P * ((1 + r)^n - 1) / r * (1 + r), with r the monthly rate and n the
+    number of months (FV = P * n when r is 0). Inputs broadcast against each other.
+    
+    Args:
+        monthly_amounts: Monthly investment(s)
+        years: Investment duration(s) in years
+        annual_rates: Expected annual return(s) in percent (e.g. 12.0)
+    
+    Returns:
+        ndarray of future values with the broadcast shape of the inputs
+    """
+    monthly_amounts = np.asarray(monthly_amounts, dtype=np.float64)
+    months = np.asarray(years, dtype=np.float64) * 12
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64) / 100 / 12
+    
+    growth = np.power(1 + monthly_rates, months)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity_factor = np.where(
+            monthly_rates != 0,
+            (growth - 1) / monthly_rates * (1 + monthly_rates),
+            months
+        )
+    return monthly_amounts * annuity_factor
+
+
+def project_portfolios(monthly_amounts, years, annual_rates, allocations):
+    """
+    Project many multi-category SIP portfolios at once
+    
+    Args:
+        monthly_amounts: shape (n,) total monthly investment per scenario
+        years: shape (n,) duration per scenario
+        annual_rates: shape (n, k) expected annual return (%) per scenario and category
+        allocations: shape (n, k) allocation (%) per scenario and category
+    
+    Returns:
+        Dict of arrays: category_values (n, k), total_invested, expected_portfolio_value,
+        expected_gains and overall_return_percentage (each shape (n,))
+    """
+    monthly_amounts = np.asarray(monthly_amounts, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    annual_rates = np.asarray(annual_rates, dtype=np.float64)
+    allocations = np.asarray(allocations, dtype=np.float64)
+    
+    # Each category grows the full SIP at its own rate, weighted by its allocation
+    category_values = sip_future_values(monthly_amounts[:, None], years[:, None], annual_rates) * allocations / 100
+    
+    total_invested = monthly_amounts * years * 12
+    expected_value = category_values.sum(axis=1)
+    expected_gains = expected_value - total_invested
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overall_return = np.where(total_invested > 0, expected_gains / total_invested * 100, 0.0)
+    
+    return {
+        'category_values': category_values,
+        'total_invested': total_invested,
+        'expected_portfolio_value': expected_value,
+        'expected_gains': expected_gains,
+        'overall_return_percentage': overall_return
+    }
+
+
+def sip_timeline(monthly_amount, years, annual_rates, allocations, frequency='yearly'):
+    """
+    Invested amount and projected value over time for each category
+    
+    Month-by-month growth factors come from one cumulative product per
+    category; values then follow the closed-form SIP formula at every month,
+    so there is no per-month Python loop.
+    
+    Args:
+        monthly_amount: Total monthly investment
+        years: Investment duration in years
+        annual_rates: shape (k,) expected annual return (%) per category
+        allocations: shape (k,) allocation (%) per category
+        frequency: 'yearly' (one point per year) or 'monthly'
+    
+    Returns:
+        Dict with 'periods' (month or year numbers, shape (t,)) and per-category
+        'invested' and 'value' arrays of shape (k, t)
+    """
+    if frequency not in ('yearly', 'monthly'):
+        raise ValueError("frequency must be 'yearly' or 'monthly'")
+    
+    months = int(round(years * 12))
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64)[:, None] / 100 / 12
+    category_amounts = monthly_amount * np.asarray(allocations, dtype=np.float64)[:, None] / 100
+    
+    # growth[c, t - 1] = (1 + r_c)^t
+    growth = np.cumprod(np.broadcast_to(1 + monthly_rates, (len(monthly_rates), months)), axis=1)
+    elapsed = np.arange(1, months + 1, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity_factor = np.where(
+            monthly_rates != 0,
+            (growth - 1) / monthly_rates * (1 + monthly_rates),
+            elapsed
+        )
+    values = category_amounts * annuity_factor
+    invested = category_amounts * elapsed
+    
+    points, periods = _sample_points(months, frequency)
+    
+    return {
+        'periods': periods,
+        'invested': invested[:, points],
+        'value': values[:, points]
+    }
+
+
+def _sample_points(months, frequency):
+    """Month indexes (0-based) and period labels for a yearly or monthly series"""
+    if frequency == 'yearly':
+        # Points at the end of each year (plus a final partial year, if any)
+        points = np.arange(11, months, 12)
+        if months % 12:
+            points = np.append(points, months - 1)
+        return points, (points + 1) / 12
+    points = np.arange(months)
+    return points, points + 1
+
+
+def build_contributions(monthly_amount, years, step_up_percentage=0.0, lump_sums=None, pauses=None):
+    """
+    Month-by-month cash flows of a planned SIP
+    
+    Args:
+        monthly_amount: Starting monthly SIP
+        years: Investment duration in years
+        step_up_percentage: Yearly increase of the SIP amount in percent (applied every 12 months)
+        lump_sums: Iterable of (month, amount) one-off investments (month 1 = first month)
+        pauses: Iterable of (start_month, end_month) inclusive ranges with no SIP instalment
+    
+    Returns:
+        Tuple (sip, lump) of arrays, one entry per month, invested at the start of the month
+    """
+    months = int(round(years * 12))
+    elapsed_years = np.arange(months) // 12
+    sip = monthly_amount * np.power(1 + step_up_percentage / 100, elapsed_years)
+    
+    for start_month, end_month in pauses or []:
+        if end_month < start_month:
+            raise ValueError("Pause end month must not be before its start month")
+        sip[max(start_month, 1) - 1:min(end_month, months)] = 0.0
+    
+    lump = np.zeros(months)
+    for month, amount in lump_sums or []:
+        if not 1 <= month <= months:
+            raise ValueError(f"Lump sum month must be between 1 and {months}")
+        lump[month - 1] += amount
+    
+    return sip, lump
+
+
+def project_cash_flows(contributions, annual_rates, allocations, frequency='yearly'):
+    """
+    Grow monthly cash flows split across categories with different rates
+    
+    The value after month m is (1 + r)^m * cumsum(c_t / (1 + r)^(t - 1)), which
+    applies V_m = (V_{m-1} + c_m) * (1 + r) for every month and category at once.
+    
+    Args:
+        contributions: shape (n,) amount invested at the start of each month
+        annual_rates: shape (k,) expected annual return (%) per category
+        allocations: shape (k,) allocation (%) per category
+        frequency: 'yearly' or 'monthly' sampling of the returned series
+    
+    Returns:
+        Dict with 'periods' (t,), per-category 'invested' and 'value' series (k, t)
+        and per-category 'final_invested' and 'final_value' (k,)
+    """
+    if frequency not in ('yearly', 'monthly'):
+        raise ValueError("frequency must be 'yearly' or 'monthly'")
+    
+    contributions = np.asarray(contributions, dtype=np.float64)
+    months = len(contributions)
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64)[:, None] / 100 / 12
+    shares = np.asarray(allocations, dtype=np.float64)[:, None] / 100
+    
+    # growth[c, t] = (1 + r_c)^(t + 1)
+    growth = np.cumprod(np.broadcast_to(1 + monthly_rates, (len(monthly_rates), months)), axis=1)
+    discounted = contributions * (1 + monthly_rates) / growth
+    values = shares * growth * np.cumsum(discounted, axis=1)
+    invested = shares * np.cumsum(contributions)
+    
+    points, periods = _sample_points(months, frequency)
+    return {
+        'periods': periods,
+        'invested': invested[:, points],
+        'value': values[:, points],
+        'final_invested': invested[:, -1] if months else np.zeros(len(shares)),
+        'final_value': values[:, -1] if months else np.zeros(len(shares))
+    }
+
+
+def contributions_xirr(contributions, final_values):
+    """
+    XIRR (%) of monthly cash flows redeemed at a final value
+    
+    Cash flow t (0-based) is invested at the start of month t + 1 and the
+    final value is received at the end of the last month. All series are
+    solved together with xirr_many.
+    
+    Args:
+        contributions: n sequences of monthly amounts (lengths may differ)
+        final_values: shape (n,) value of each series at the end
+    
+    Returns:
+        List of n XIRR percentages rounded to 2 decimals (None where unsolvable)
+    """
+    amounts = [np.append(-np.asarray(c, dtype=np.float64), value) for c, value in zip(contributions, final_values)]
+    days = [np.arange(len(flows)) * DAYS_PER_YEAR / 12 for flows in amounts]
+    rates = xirr_many(amounts, days) * 100
+    return [None if np.isnan(rate) else round(float(rate), 2) for rate in rates]
+
+# Made with Bob